@@ -0,0 +1,159 @@
+import asyncio
+import hashlib
+import os
+import shutil
+import threading
+import unicodedata
+from collections import OrderedDict
+
+from config import AUDIO_CACHE_DIR, AUDIO_CACHE_MAX_BYTES
+from database import get_cached_file_id, save_cached_file_id, delete_cached_file_id
+
+def normalize_text(text):
+    """Kesh kaliti uchun matnni bir xil ko'rinishga keltirish."""
+    text = unicodedata.normalize("NFC", text or "")
+    return " ".join(text.split())
+
+def make_cache_key(text, voice, rate):
+    """(matn, ovoz, tezlik) uchligidan barqaror kalit."""
+    raw = "\x1f".join((normalize_text(text), voice, rate))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class AudioCache:
+    """
+    Ikki darajali kesh:
+    1. Bazadagi kalit -> Telegram file_id (sintez ham, yuklash ham kerak emas).
+    2. Diskdagi cheklangan hajmli LRU MP3 fayllar (faqat yuklash kerak).
+    Fayllar event loop'da o'qilmaydi: diskdagi natija yo'l sifatida qaytadi, yozish oqimda.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "stores": 0}
+        self._index = OrderedDict()  # kalit -> fayl hajmi (eng eskisi boshida)
+        self._size = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    def reconfigure(self, directory, max_bytes):
+        """Boshqa papka va hajm chegarasi bilan qayta yuklash (webhook worker'lari uchun)."""
+        with self._lock:
+            self.directory = directory
+            self.max_bytes = max_bytes
+            self._index.clear()
+            self._size = 0
+        self._load()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.mp3")
+
+    def _load(self):
+        os.makedirs(self.directory, exist_ok=True)
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".mp3"):
+                continue
+            st = os.stat(os.path.join(self.directory, name))
+            entries.append((st.st_mtime, name[:-4], st.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._size += size
+        self._evict()
+
+    def _evict(self):
+        while self._size > self.max_bytes and self._index:
+            key, size = self._index.popitem(last=False)
+            self._size -= size
+            self.stats["evictions"] += 1
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    async def get_file_id(self, key):
+        file_id = await get_cached_file_id(key)
+        if file_id:
+            self.stats["hits"] += 1
+        return file_id
+
+    async def set_file_id(self, key, file_id):
+        await save_cached_file_id(key, file_id)
+
+    async def forget_file_id(self, key):
+        """Telegram file_id ni rad etsa (masalan, fayl o'chirilgan), yozuvni olib tashlash."""
+        await delete_cached_file_id(key)
+
+    def get_path(self, key):
+        """Keshdagi MP3 fayl yo'li (FSInputFile orqali yuklash uchun) yoki None."""
+        with self._lock:
+            if key not in self._index:
+                self.stats["misses"] += 1
+                return None
+            self._index.move_to_end(key)
+        path = self._path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self._size -= self._index.pop(key, 0)
+                self.stats["misses"] += 1
+            return None
+        self.stats["disk_hits"] += 1
+        return path
+
+    def _store(self, key, size, write):
+        if size > self.max_bytes:
+            return
+        tmp_path = self._path(key) + ".part"
+        write(tmp_path)
+        os.replace(tmp_path, self._path(key))
+        with self._lock:
+            self._size -= self._index.pop(key, 0)
+            self._index[key] = size
+            self._size += size
+            self.stats["stores"] += 1
+            self._evict()
+
+    async def put_bytes(self, key, data):
+        def write(path):
+            with open(path, "wb") as f:
+                f.write(data)
+        await asyncio.to_thread(self._store, key, len(data), write)
+
+    async def put_buffer(self, key, audio):
+        """utils.AudioBuffer ni (xotirada yoki faylda bo'lsa ham) keshga yozish - alohida oqimda."""
+        await asyncio.to_thread(self._store, key, audio.size, audio.save)
+
+    def snapshot(self):
+        """Admin panel uchun hisoblagichlar va joriy hajm."""
+        with self._lock:
+            return dict(self.stats, entries=len(self._index), size_bytes=self._size, max_bytes=self.max_bytes)
+
+audio_cache = AudioCache(AUDIO_CACHE_DIR, AUDIO_CACHE_MAX_BYTES)
+
+def use_worker_dir(index, workers):
+    """
+    Webhook rejimi: LRU indeksi har bir jarayonda alohida, shuning uchun umumiy papka N baravar ko'p joy
+    egallardi va worker'lar bir-birining fayllarini o'chirardi. Har bir worker o'z papkasi va
+    AUDIO_CACHE_MAX_BYTES / workers ulushiga ega; 0-worker asosiy papkada qoladi (polling rejimi keshi
+    saqlanadi). file_id keshi bazada - u hamma worker'lar uchun umumiy.
+    """
+    if workers <= 1:
+        return
+    directory = AUDIO_CACHE_DIR if index == 0 else os.path.join(AUDIO_CACHE_DIR, f"worker_{index}")
+    audio_cache.reconfigure(directory, AUDIO_CACHE_MAX_BYTES // workers)
+    if index == 0:
+        # Worker'lar soni kamaytirilgan bo'lsa - endi hech kimga tegishli bo'lmagan papkalar
+        for name in os.listdir(AUDIO_CACHE_DIR):
+            suffix = name[len("worker_"):]
+            if name.startswith("worker_") and suffix.isdigit() and int(suffix) >= workers:
+                shutil.rmtree(os.path.join(AUDIO_CACHE_DIR, name), ignore_errors=True)
+
+def format_cache_stats():
+    s = audio_cache.snapshot()
+    lookups = s["hits"] + s["disk_hits"] + s["misses"]
+    hit_rate = (s["hits"] + s["disk_hits"]) * 100 // lookups if lookups else 0
+    return (f"💾 Kesh: {s['entries']} ta, {s['size_bytes'] // (1024 * 1024)}/{s['max_bytes'] // (1024 * 1024)} MB\n"
+            f"   ✅ file_id: {s['hits']} | 📁 disk: {s['disk_hits']} | ❌ miss: {s['misses']} "
+            f"| 🗑 evict: {s['evictions']} | 🎯 {hit_rate}%")
@@ -0,0 +1,152 @@
+import asyncio
+import re
+
+from config import AUDIOBOOK_PART_CHARS, AUDIOBOOK_FIRST_PART_CHARS, AUDIOBOOK_CANCEL_POLL, TTS_RATE
+from utils import translate_text, generate_audio, split_for_translation, tts_semaphore, AudioBuffer
+from audio_cache import audio_cache, make_cache_key
+from database import register_audiobook, finish_audiobook, request_audiobook_cancel, audiobook_cancelled
+from keyboards import audiobook_cancel_kb
+from metrics import metrics
+
+# Bob sarlavhalari: "Chapter 3", "2-bob", "Глава 5", "Bölüm 1", "IV qism" va h.k.
+_CHAPTER_RE = re.compile(
+    r'^[ \t]*(?:(?:chapter|bob|qism|глава|часть|bölüm|part|section)\b[^\n]*'
+    r'|(?:\d+|[IVXLC]+)[ \t]*[-.]?[ \t]*(?:bob|qism|глава|bölüm)\b[^\n]*)$',
+    re.IGNORECASE | re.MULTILINE,
+)
+
+# Foydalanuvchi -> to'xtatish signali (shu jarayondagi kitoblar; boshqa worker'lar - bazadan)
+_cancel_events = {}
+
+def split_into_parts(text, limit=AUDIOBOOK_PART_CHARS, first_limit=AUDIOBOOK_FIRST_PART_CHARS):
+    """
+    Matnni boblar bo'yicha, katta boblarni esa gap chegarasida hajm bo'yicha qismlarga ajratish.
+    Birinchi qism first_limit gacha qisqartiriladi (qolgani ikkinchi qism bo'ladi) - tinglovchi
+    birinchi audioni butun katta qism tarjima va sintez qilinishini kutmasdan oladi.
+    """
+    starts = [m.start() for m in _CHAPTER_RE.finditer(text)]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    bounds = starts[1:] + [len(text)]
+
+    parts = []
+    for start, end in zip(starts, bounds):
+        chapter = text[start:end].strip()
+        if not chapter:
+            continue
+        if len(chapter) <= limit:
+            parts.append(chapter)
+        else:
+            parts.extend(chunk for chunk, _ in split_for_translation(chapter, limit) if chunk.strip())
+    if parts and len(parts[0]) > first_limit:
+        chunks = split_for_translation(parts[0], first_limit)
+        rest = "".join(chunk + sep for chunk, sep in chunks[1:]).strip()
+        parts[:1] = [chunks[0][0], rest] if rest else [chunks[0][0]]
+    return parts
+
+async def cancel_audiobook(user_id):
+    """Kitob shu jarayonda bo'lsa - darhol, boshqa worker'da bo'lsa - baza orqali to'xtatiladi."""
+    event = _cancel_events.get(user_id)
+    if event is not None:
+        event.set()
+        return True
+    return await request_audiobook_cancel(user_id)
+
+async def _watch_cancel(user_id, cancel):
+    while not cancel.is_set():
+        await asyncio.sleep(AUDIOBOOK_CANCEL_POLL)
+        if await audiobook_cancelled(user_id):
+            cancel.set()
+
+async def run_audiobook(bot, prog, user_id, original_text, lang_code, voice_id, caption):
+    """
+    Konveyer: keyingi qism sintez qilinayotganda tayyor qism darhol yuboriladi.
+    Navbat hajmi 1 - sintez yuklashdan ko'pi bilan bitta qism oldinda yuradi,
+    shuning uchun to'xtatilganda ortiqcha sintez qilinmaydi.
+    """
+    parts = split_into_parts(original_text)
+    total = len(parts)
+    await register_audiobook(user_id)
+    cancel = asyncio.Event()
+    _cancel_events[user_id] = cancel
+    watcher = asyncio.create_task(_watch_cancel(user_id, cancel))
+    queue = asyncio.Queue(maxsize=1)
+
+    async def producer():
+        try:
+            for i, part in enumerate(parts):
+                key = make_cache_key(part, voice_id, TTS_RATE)
+                file_id = await audio_cache.get_file_id(key)
+                if file_id:
+                    await queue.put((i, key, file_id, None))
+                    continue
+                final_text = await translate_text(part, lang_code)
+                audio = AudioBuffer()
+                try:
+                    async with tts_semaphore:
+                        await generate_audio(final_text, voice_id, audio)
+                    await queue.put((i, key, None, audio))
+                except BaseException:
+                    audio.close()
+                    raise
+            await queue.put(None)
+        except Exception as e:
+            await queue.put(e)
+
+    chat_id = prog.message.chat.id
+
+    def report(sent):
+        prog.update(f"📖 Audiokitob: {sent}/{total} qism yuborildi...", reply_markup=audiobook_cancel_kb())
+
+    report(0)
+    task = asyncio.create_task(producer())
+    sent = audio_bytes = 0
+    try:
+        while True:
+            getter = asyncio.create_task(queue.get())
+            stopper = asyncio.create_task(cancel.wait())
+            await asyncio.wait({getter, stopper}, return_when=asyncio.FIRST_COMPLETED)
+            stopper.cancel()
+            if cancel.is_set():
+                if not getter.done():
+                    getter.cancel()
+                elif isinstance(getter.result(), tuple) and getter.result()[3] is not None:
+                    getter.result()[3].close()
+                break
+            item = getter.result()
+            if item is None:
+                break
+            if isinstance(item, Exception):
+                raise item
+
+            i, key, file_id, audio = item
+            part_caption = f"{caption}\n📖 Qism: {i + 1}/{total}"
+            if file_id:
+                with metrics.stage("upload"):
+                    await bot.send_audio(chat_id, file_id, caption=part_caption, parse_mode="HTML")
+            else:
+                try:
+                    await audio_cache.put_buffer(key, audio)
+                    with metrics.stage("upload"):
+                        msg = await bot.send_audio(chat_id, audio.as_input_file(f"part_{i + 1:03d}.mp3"),
+                                                   caption=part_caption, parse_mode="HTML")
+                    if msg.audio:
+                        await audio_cache.set_file_id(key, msg.audio.file_id)
+                    audio_bytes += audio.size
+                finally:
+                    audio.close()
+            sent += 1
+            report(sent)
+    finally:
+        task.cancel()
+        watcher.cancel()
+        await asyncio.gather(task, watcher, return_exceptions=True)
+        # Navbatda qolgan, yuborilmagan buferni tozalash
+        while not queue.empty():
+            item = queue.get_nowait()
+            if isinstance(item, tuple) and item[3] is not None:
+                item[3].close()
+        if _cancel_events.get(user_id) is cancel:
+            del _cancel_events[user_id]
+            await finish_audiobook(user_id)
+    return sent, total, cancel.is_set(), audio_bytes
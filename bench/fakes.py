@@ -0,0 +1,161 @@
+"""
+Tarmoqsiz benchmark uchun mahalliy o'rinbosarlar: Telegram Bot API sessiyasi,
+edge-tts va GoogleTranslator. Kechikish va xatolar taqsimoti sozlanadi.
+"""
+import asyncio
+import itertools
+import random
+import sys
+import time
+import types
+from collections import Counter
+from datetime import datetime
+
+class LatencyModel:
+    """Log-normal kechikish (median atrofida) va berilgan ehtimollik bilan xato."""
+
+    def __init__(self, median=0.1, sigma=0.5, error_rate=0.0, seed=None):
+        self.median = median
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+
+    def sample(self):
+        if self.median <= 0:
+            return 0.0
+        return self.median * self._rng.lognormvariate(0, self.sigma)
+
+    def should_fail(self):
+        return self._rng.random() < self.error_rate
+
+class ProviderError(Exception):
+    """Soxta provayder xatosi (tarmoq uzilishi, 5xx va h.k.)."""
+
+# --- edge-tts ---
+
+# MPEG-2 Layer III, 48 kbit/s, 24 kHz, mono - edge-tts standart formati; bitta kadr = 24 ms
+_FRAME = bytes([0xFF, 0xF3, 0x64, 0xC4]) + bytes(140)
+_CHARS_PER_SECOND = 15
+
+def make_fake_edge_tts(model):
+    module = types.ModuleType("edge_tts")
+
+    class Communicate:
+        def __init__(self, text, voice, rate="+0%", **kwargs):
+            self.text = text
+            self.voice = voice
+
+        async def stream(self):
+            await asyncio.sleep(model.sample())
+            if model.should_fail():
+                raise ProviderError("soxta edge-tts xatosi")
+            frames = max(1, int(len(self.text) / _CHARS_PER_SECOND / 0.024))
+            # Haqiqiy oqim kabi bo'lak-bo'lak yuboriladi
+            for start in range(0, frames, 40):
+                yield {"type": "audio", "data": _FRAME * min(40, frames - start)}
+                await asyncio.sleep(0)
+
+        async def save(self, path):
+            with open(path, "wb") as f:
+                async for chunk in self.stream():
+                    f.write(chunk["data"])
+
+    module.Communicate = Communicate
+    return module
+
+# --- deep_translator ---
+
+def make_fake_deep_translator(model):
+    module = types.ModuleType("deep_translator")
+
+    class GoogleTranslator:
+        def __init__(self, source="auto", target="en", **kwargs):
+            self.target = target
+
+        def translate(self, text, **kwargs):
+            time.sleep(model.sample())  # haqiqiy klient ham sinxron
+            if model.should_fail():
+                raise ProviderError("soxta tarjima xatosi")
+            return text
+
+    module.GoogleTranslator = GoogleTranslator
+    return module
+
+def install_fake_providers(tts_model, translate_model):
+    """Loyiha modullari import qilinishidan OLDIN chaqirilishi kerak."""
+    sys.modules["edge_tts"] = make_fake_edge_tts(tts_model)
+    sys.modules["deep_translator"] = make_fake_deep_translator(translate_model)
+
+# --- Telegram Bot API ---
+
+def make_fake_session(model):
+    """aiogram Bot uchun tarmoqsiz sessiya (aiogram shu yerda import qilinadi)."""
+    from aiogram.client.session.base import BaseSession
+    from aiogram.methods import TelegramMethod
+
+    class FakeSession(BaseSession):
+        def __init__(self):
+            super().__init__()
+            self.calls = Counter()
+            self.error_messages = 0
+            self.rejected = 0
+            self.last_message_id = {}
+            self._ids = itertools.count(1)
+
+        def _message(self, bot, method, **extra):
+            chat_id = getattr(method, "chat_id", None) or 0
+            message_id = next(self._ids)
+            self.last_message_id[chat_id] = message_id
+            data = {
+                "message_id": message_id,
+                "date": int(datetime.now().timestamp()),
+                "chat": {"id": chat_id, "type": "private"},
+                "text": getattr(method, "text", None),
+                **extra,
+            }
+            return data
+
+        async def make_request(self, bot, method: TelegramMethod, timeout=None):
+            await asyncio.sleep(model.sample())
+            name = type(method).__name__
+            self.calls[name] += 1
+            text = getattr(method, "text", None)
+            if isinstance(text, str) and text.startswith("❌"):
+                self.error_messages += 1
+            elif isinstance(text, str) and text.startswith("⏳ Server hozir band"):
+                self.rejected += 1
+
+            if name == "SendMessage":
+                result = self._message(bot, method)
+            elif name == "EditMessageText":
+                # Tahrirda xabar identifikatori o'zgarmaydi
+                result = {**self._message(bot, method), "message_id": method.message_id}
+                self.last_message_id[method.chat_id] = method.message_id
+            elif name == "SendAudio":
+                audio = method.audio if isinstance(method.audio, str) else f"fake-{next(self._ids)}"
+                result = self._message(bot, method, audio={
+                    "file_id": audio, "file_unique_id": audio, "duration": 1,
+                })
+            elif name == "CopyMessage":
+                result = {"message_id": next(self._ids)}
+            elif name == "SendMediaGroup":
+                result = [self._message(bot, method) for _ in method.media]
+            else:
+                result = True
+            return self._validate(bot, method, result)
+
+        @staticmethod
+        def _validate(bot, method, result):
+            returning = method.__returning__
+            if returning is bool:
+                return True
+            from pydantic import TypeAdapter
+            return TypeAdapter(returning).validate_python(result, context={"bot": bot})
+
+        async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+            yield b""
+
+        async def close(self):
+            pass
+
+    return FakeSession()
@@ -0,0 +1,72 @@
+"""
+Sovuq ishga tushish: modullarni import qilish vaqti.
+
+Ishga tushirish (loyiha ildizidan):
+    python -m bench.import_time [--module bot] [--top 15] [--repeat 5]
+
+Har bir o'lchov yangi jarayonda `python -X importtime` bilan olinadi. Natijada umumiy vaqt,
+eng og'ir importlar va bot jarayoniga keraksiz og'ir modullar yuklangan-yuklanmagani ko'rsatiladi.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Bot jarayoni ishga tushganda yuklanmasligi kerak bo'lgan modullar (birinchi ishlatilganda yuklanadi)
+_LAZY = ("streamlit", "edge_tts", "deep_translator", "PyPDF2", "docx")
+
+def measure(module):
+    """-> (devor soati, [(cumulative_us, self_us, nom), ...])"""
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - started
+    if proc.returncode != 0:
+        raise SystemExit(f"`import {module}` xato bilan tugadi:\n{proc.stderr[-2000:]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+    return wall, rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Import vaqti benchmarki")
+    parser.add_argument("--module", action="append", help="o'lchanadigan modul (bir necha marta berish mumkin)")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for module in args.module or ["config", "keyboards", "handlers", "bot"]:
+        walls, best = [], None
+        for _ in range(args.repeat):
+            wall, rows = measure(module)
+            walls.append(wall)
+            if best is None or wall == min(walls):
+                best = rows
+        walls.sort()
+        target = next((r for r in best if r[2].strip() == module), None)
+        print(f"\n=== import {module} ===")
+        print(f"Jarayon (interpretator bilan): min {walls[0] * 1000:.0f} ms, "
+              f"median {walls[len(walls) // 2] * 1000:.0f} ms")
+        if target:
+            print(f"Modul importi (cumulative): {target[0] / 1000:.1f} ms")
+
+        loaded = {r[2].strip().split(".")[0] for r in best}
+        heavy = [name for name in _LAZY if name in loaded]
+        print("Og'ir modullar yuklangan: " + (", ".join(heavy) if heavy else "yo'q ✅"))
+
+        print(f"{'cumulative ms':>14}{'self ms':>10}  modul")
+        # Faqat yuqori darajadagi (ichma-ich bo'lmagan) importlar - yig'indi ikki marta sanalmaydi
+        top_level = [r for r in best if not r[2].startswith("  ")]
+        for cumulative, self_us, name in sorted(top_level, reverse=True)[:args.top]:
+            print(f"{cumulative / 1000:>14.1f}{self_us / 1000:>10.1f}  {name.strip()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+Tarmoqsiz yuklama testi: content_handler -> lang_choice -> voice_choice oqimi
+N ta soxta foydalanuvchi uchun haqiqiy Dispatcher orqali o'tkaziladi.
+Telegram, edge-tts va tarjimon bench/fakes.py dagi o'rinbosarlar bilan almashtiriladi.
+
+Ishga tushirish (loyiha ildizidan):
+    python -m bench.loadtest [--users 50] [--lang en] [--chars 400]
+                             [--tts-latency 0.3] [--tts-errors 0.02] [--json natija.json]
+
+Baza va audio keshi vaqtinchalik papkada yaratiladi - ishchi bazaga tegilmaydi.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from bench.fakes import LatencyModel, install_fake_providers, make_fake_session
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_SAMPLES = {
+    "multi": "Hello, how are you today? (Salom, bugun qalaysiz?) Merhaba dünya! Привет, мир. ",
+    "default": "Bugun ob-havo juda yaxshi, shuning uchun biz bog'da sayr qilishga qaror qildik. ",
+}
+
+def make_text(lang, chars, user_id, same_text):
+    sample = _SAMPLES["multi" if lang == "multi" else "default"]
+    body = (sample * (chars // len(sample) + 1))[:chars]
+    # Har bir foydalanuvchiga alohida matn - aks holda kesh natijani buzadi
+    return body if same_text else f"{user_id}. {body}"
+
+def _percentile(samples, q):
+    if not samples:
+        return None
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+class Driver:
+    """Update'larni Dispatcher'ga beradi; bot javoblari soxta sessiyada qoladi."""
+
+    def __init__(self, dp, bot, session):
+        self.dp = dp
+        self.bot = bot
+        self.session = session
+        self._update_id = 0
+
+    def _next_id(self):
+        self._update_id += 1
+        return self._update_id
+
+    @staticmethod
+    def _user(user_id):
+        return {"id": user_id, "is_bot": False, "first_name": f"Bench {user_id}"}
+
+    async def send_text(self, user_id, text):
+        from aiogram.types import Update
+        update = Update.model_validate({
+            "update_id": self._next_id(),
+            "message": {
+                "message_id": self._next_id(),
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "from": self._user(user_id),
+                "text": text,
+            },
+        }, context={"bot": self.bot})
+        await self.dp.feed_update(self.bot, update)
+
+    async def press(self, user_id, data):
+        """Botning oxirgi xabaridagi inline tugmani bosish."""
+        from aiogram.types import Update
+        update = Update.model_validate({
+            "update_id": self._next_id(),
+            "callback_query": {
+                "id": str(self._next_id()),
+                "from": self._user(user_id),
+                "chat_instance": str(user_id),
+                "data": data,
+                "message": {
+                    "message_id": self.session.last_message_id[user_id],
+                    "date": int(time.time()),
+                    "chat": {"id": user_id, "type": "private"},
+                    "text": "...",
+                },
+            },
+        }, context={"bot": self.bot})
+        await self.dp.feed_update(self.bot, update)
+
+async def simulate_user(driver, user_id, args, latencies, steps):
+    text = make_text(args.lang, args.chars, user_id, args.same_text)
+    started = time.perf_counter()
+
+    await driver.send_text(user_id, text)
+    t1 = time.perf_counter()
+    await driver.press(user_id, f"lang_{args.lang}")
+    t2 = time.perf_counter()
+    await driver.press(user_id, f"voice_{args.lang}_{args.voice}")
+    t3 = time.perf_counter()
+
+    latencies.append(t3 - started)
+    steps["content"].append(t1 - started)
+    steps["lang"].append(t2 - t1)
+    steps["voice"].append(t3 - t2)
+
+async def run(args):
+    # Loyiha modullari faqat soxta provayderlar o'rnatilgandan keyin import qilinadi
+    from aiogram import Bot, Dispatcher
+    from database import init_db, flush_stats
+    from handlers import router
+    from scheduler import scheduler
+    from metrics import metrics
+    from storage import SQLiteStorage
+
+    init_db()
+    session = make_fake_session(LatencyModel(args.api_latency, error_rate=0.0, seed=args.seed))
+    bot = Bot(token="123456:BENCHMARK", session=session)
+    # Ishlab chiqarishdagi kabi bazadagi FSM (bitta worker - LRU keshi bilan)
+    dp = Dispatcher(storage=SQLiteStorage())
+    dp.include_router(router)
+    scheduler.start()
+
+    driver = Driver(dp, bot, session)
+    latencies, steps = [], {"content": [], "lang": [], "voice": []}
+    gate = asyncio.Semaphore(args.concurrency or args.users)
+
+    async def one(user_id):
+        async with gate:
+            await simulate_user(driver, user_id, args, latencies, steps)
+            if args.think_time:
+                await asyncio.sleep(args.think_time)
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    base_id = 10_000_000
+    await asyncio.gather(*(one(base_id + i) for i in range(args.users)))
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    await flush_stats()
+    await scheduler.stop()
+    await bot.session.close()
+
+    completed = session.calls["SendAudio"]
+    return {
+        "users": args.users,
+        "lang": args.lang,
+        "chars": args.chars,
+        "elapsed_seconds": round(elapsed, 3),
+        "audios_sent": completed,
+        "errors": session.error_messages,
+        "rejected": session.rejected,
+        "throughput_per_minute": round(completed / elapsed * 60, 1) if elapsed else None,
+        "latency": {
+            "p50": _percentile(latencies, 0.50),
+            "p95": _percentile(latencies, 0.95),
+            "p99": _percentile(latencies, 0.99),
+            "max": max(latencies) if latencies else None,
+        },
+        "steps_p95": {name: _percentile(values, 0.95) for name, values in steps.items()},
+        "stages": metrics.snapshot(),
+        "providers": {group: dict(values) for group, values in metrics.counters.items()},
+        "api_calls": dict(session.calls),
+        "tracemalloc_peak_mb": round(peak / 1024 / 1024, 2),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 2),
+    }
+
+def _fmt(value):
+    return "-" if value is None else f"{value:.3f}"
+
+def print_report(report):
+    print(f"\nFoydalanuvchilar: {report['users']}  til: {report['lang']}  matn: {report['chars']} belgi")
+    print(f"Vaqt: {report['elapsed_seconds']} s  audio: {report['audios_sent']}  xatolar: {report['errors']}  "
+          f"rad etilgan: {report['rejected']}")
+    print(f"O'tkazuvchanlik: {report['throughput_per_minute']} audio/daqiqa")
+    lat = report["latency"]
+    print(f"To'liq oqim (s): p50={_fmt(lat['p50'])}  p95={_fmt(lat['p95'])}  "
+          f"p99={_fmt(lat['p99'])}  max={_fmt(lat['max'])}")
+    print("Qadamlar p95 (s): " + "  ".join(f"{k}={_fmt(v)}" for k, v in report["steps_p95"].items()))
+    print(f"Xotira: tracemalloc cho'qqisi {report['tracemalloc_peak_mb']} MB, max RSS {report['max_rss_mb']} MB")
+
+    print(f"\n{'bosqich':<12}{'soni':>7}{'xato':>7}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for name, s in sorted(report["stages"].items()):
+        print(f"{name:<12}{s['count']:>7}{s['errors']:>7}{_fmt(s['p50']):>9}{_fmt(s['p95']):>9}{_fmt(s['p99']):>9}")
+    for group, values in sorted(report["providers"].items()):
+        print(f"Provayder {group}: " + ", ".join(f"{k}={v}" for k, v in values.items()))
+    print("\nBot API chaqiruvlari: " + ", ".join(f"{k}={v}" for k, v in sorted(report["api_calls"].items())))
+
+def main():
+    parser = argparse.ArgumentParser(description="Tarmoqsiz yuklama testi")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=0, help="bir vaqtdagi foydalanuvchilar (0 - hammasi)")
+    parser.add_argument("--lang", default="en", help="lang_ tugmasi: en, ru, multi, ...")
+    parser.add_argument("--voice", default="female_1")
+    parser.add_argument("--chars", type=int, default=400)
+    parser.add_argument("--same-text", action="store_true", help="hamma bir xil matn yuboradi (kesh sinovi)")
+    parser.add_argument("--think-time", type=float, default=0.0)
+    parser.add_argument("--api-latency", type=float, default=0.05, help="Bot API median kechikishi (s)")
+    parser.add_argument("--tts-latency", type=float, default=0.3)
+    parser.add_argument("--tts-errors", type=float, default=0.0)
+    parser.add_argument("--translate-latency", type=float, default=0.1)
+    parser.add_argument("--translate-errors", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="natijani JSON faylga yozish (regressiyalarni solishtirish uchun)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, stream=sys.stdout)
+    install_fake_providers(
+        LatencyModel(args.tts_latency, error_rate=args.tts_errors, seed=args.seed),
+        LatencyModel(args.translate_latency, error_rate=args.translate_errors, seed=args.seed + 1),
+    )
+
+    # Baza va audio keshi nisbiy yo'llarda - vaqtinchalik papkada ishlaymiz
+    sys.path.insert(0, ROOT)
+    json_path = os.path.abspath(args.json) if args.json else None
+    workdir = tempfile.mkdtemp(prefix="audioai-bench-")
+    os.chdir(workdir)
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Mix rejim segmentlash mikrobenchmarki.
+
+Ishga tushirish (loyiha ildizidan):
+    python -m bench.segmenter_bench [--repeat 200]
+
+Eski (qavs bo'yicha, 5 ta regex) va yangi (bitta translate o'tishi, gap bo'yicha,
+bir xil ovozlarni birlashtirish) usullarining tezligi va TTS chaqiruvlari soni solishtiriladi.
+"""
+import argparse
+import re
+import time
+
+from segmenter import split_text_by_pattern, segment_text
+
+# --- Eski usul (solishtirish uchun o'zgarishsiz nusxa) ---
+
+def legacy_detect(text):
+    if re.search(r'[\uAC00-\uD7AF]', text):
+        return 'ko'
+    elif re.search(r'[\u0600-\u06FF]', text):
+        return 'ar'
+    elif re.search(r'[а-яА-ЯёЁ]', text):
+        return 'ru'
+    elif re.search(r'[çğışöüÇĞİŞÖÜ]', text):
+        return 'tr'
+    elif re.search(r'[a-zA-Z]', text):
+        return 'en'
+    return 'en'
+
+def legacy_split(text):
+    segments = []
+    for part in re.findall(r'(\([^()]+\)|[^()]+)', text):
+        clean_part = part.strip()
+        if not clean_part:
+            continue
+        if clean_part.startswith("(") and clean_part.endswith(")"):
+            segments.append({'text': clean_part[1:-1].strip(), 'lang': 'uz'})
+        else:
+            segments.append({'text': clean_part, 'lang': legacy_detect(clean_part)})
+    return segments
+
+# --- Aralash yozuvli korpus ---
+
+CORPUS = [
+    "Annyeong! (Salom!) Merhaba! (Qalay!)",
+    "(Salom) (Qalay) (Yaxshi) (Rahmat) (Xayr)",
+    "Hello, how are you? (Qalaysiz?) I am fine. (Yaxshiman.) Thank you! (Rahmat!)",
+    "Привет! Как дела? (Salom! Ishlar qalay?) Всё хорошо. (Hammasi yaxshi.)",
+    "안녕하세요. 만나서 반갑습니다. (Salom. Tanishganimdan xursandman.) 감사합니다!",
+    "مرحبا بكم. (Xush kelibsiz.) Welcome. Добро пожаловать. Hoş geldiniz, çok güzel!",
+    "Word (so'z) - apple (olma), book (kitob), pen (ruchka), water (suv), bread (non).",
+]
+
+def run(fn, texts, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            fn(text)
+    return time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    # Kichik namunalar bilan bir qatorda uzun dars matni
+    texts = CORPUS + [" ".join(CORPUS) * 20]
+
+    legacy_calls = sum(len(legacy_split(t)) for t in texts)
+    new_calls = sum(len(segment_text(t, "female_1")) for t in texts)
+
+    t_legacy = run(legacy_split, texts, args.repeat)
+    t_split = run(split_text_by_pattern, texts, args.repeat)
+    t_plan = run(lambda t: segment_text(t, "female_1"), texts, args.repeat)
+
+    n = args.repeat * len(texts)
+    print(f"Matnlar: {len(texts)} x {args.repeat} marta")
+    print(f"{'usul':<28}{'mks/matn':>12}{'TTS chaqiruvlari':>20}")
+    print(f"{'eski (qavs + 5 regex)':<28}{t_legacy / n * 1e6:>12.1f}{legacy_calls:>20}")
+    print(f"{'yangi: segmentlash':<28}{t_split / n * 1e6:>12.1f}{'-':>20}")
+    print(f"{'yangi: + birlashtirish':<28}{t_plan / n * 1e6:>12.1f}{new_calls:>20}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Botni Streamlit'siz ishga tushirish.
+
+    python bot.py --mode polling
+    python bot.py --mode webhook --webhook-url https://example.com --workers 4
+
+Webhook rejimida har bir worker alohida jarayon (o'z event loop'i va GIL'i bilan) bo'lib,
+bir xil portni SO_REUSEPORT orqali tinglaydi - yadro ulanishlarni ular orasida taqsimlaydi.
+Jarayonlar umumiy SQLite bazasi orqali kelishadi: FSM holatlari, statistika, file_id keshi
+va broadcast holati bazada turadi. Diskdagi MP3 keshi esa bo'lingan: har bir worker o'z papkasi
+va AUDIO_CACHE_MAX_BYTES ulushiga ega.
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import sys
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+from config import BOT_TOKEN, WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_PATH, WEBHOOK_SECRET, FSM_CACHE_BYTES
+from database import init_db, stats_flusher, flush_stats
+from handlers import router
+from scheduler import scheduler
+from broadcast import resume_broadcasts
+from metrics import metrics
+from storage import SQLiteStorage
+from audio_cache import use_worker_dir
+from previews import start_refresh as refresh_previews
+
+# --- 1. Dispatcher va fon vazifalari ---
+
+_tasks = []
+
+async def on_startup(bot: Bot, dispatcher: Dispatcher, primary: bool):
+    # TTS ishlari navbati worker'larini ishga tushirish
+    scheduler.start()
+    # Statistikani davriy ravishda bazaga yozish va eskirgan FSM holatlarini o'chirish
+    _tasks.append(asyncio.create_task(stats_flusher()))
+    _tasks.append(asyncio.create_task(dispatcher.storage.purger()))
+    # Uzilib qolgan ommaviy xabarlarni faqat bitta jarayon davom ettiradi (aks holda takror yuboriladi)
+    if primary:
+        await resume_broadcasts(bot)
+        # Ovoz namunalari: faqat yangi/o'zgargan ovozlar fonda sintez qilinadi
+        _tasks.append(refresh_previews(bot))
+
+async def on_shutdown():
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
+    await scheduler.stop()
+    await flush_stats()
+
+def create_dispatcher(workers=1, primary=True):
+    # Bir nechta jarayonda xotiradagi LRU eskirib qolishi mumkin - holat faqat bazadan o'qiladi
+    storage = SQLiteStorage(cache_bytes=FSM_CACHE_BYTES if workers == 1 else 0)
+    dp = Dispatcher(storage=storage)
+    dp["primary"] = primary
+    dp.include_router(router)
+    dp.startup.register(on_startup)
+    dp.shutdown.register(on_shutdown)
+    return dp
+
+# --- 2. Long polling (bitta jarayon) ---
+
+async def run_polling(handle_signals=True):
+    # Ma'lumotlar bazasini yaratish/tekshirish
+    init_db()
+    bot = Bot(token=BOT_TOKEN)
+    dp = create_dispatcher()
+    # Eskirgan xabarlarni o'chirib yuborish (Webhookni tozalash)
+    await bot.delete_webhook(drop_pending_updates=True)
+    # Streamlit oqimida handle_signals=False bo'lishi shart (RuntimeError)
+    await dp.start_polling(bot, handle_signals=handle_signals)
+
+# --- 3. Webhook (bir nechta jarayon) ---
+
+async def metrics_view(request):
+    """Shu worker'ning metrikalari (Prometheus formatida)."""
+    return web.Response(text=metrics.render_prometheus(), content_type="text/plain")
+
+def serve_webhook(args, index):
+    logging.basicConfig(level=logging.INFO, stream=sys.stdout,
+                        format=f"[worker {index}] %(levelname)s %(name)s: %(message)s")
+    bot = Bot(token=BOT_TOKEN)
+    dp = create_dispatcher(workers=args.workers, primary=index == 0)
+    # Disk keshi: har bir worker o'z papkasi va hajm ulushi bilan
+    use_worker_dir(index, args.workers)
+
+    app = web.Application()
+    SimpleRequestHandler(dispatcher=dp, bot=bot, secret_token=args.secret or None).register(app, path=args.path)
+    app.router.add_get("/metrics", metrics_view)
+    setup_application(app, dp, bot=bot)
+    web.run_app(app, host=args.host, port=args.port, reuse_port=args.workers > 1,
+                handle_signals=True, print=None)
+
+async def set_webhook(args):
+    bot = Bot(token=BOT_TOKEN)
+    try:
+        await bot.set_webhook(
+            args.webhook_url.rstrip("/") + args.path,
+            secret_token=args.secret or None,
+            # Dispatcher yaratilmaydi: router faqat bir marta ulanishi mumkin (--workers 1 da serve_webhook ulaydi)
+            allowed_updates=router.resolve_used_update_types(),
+            drop_pending_updates=True,
+        )
+    finally:
+        await bot.session.close()
+
+def run_webhook(args):
+    # Sxema migratsiyasi bir marta, worker'lar ishga tushishidan oldin
+    init_db()
+    if args.webhook_url:
+        asyncio.run(set_webhook(args))
+    if args.workers == 1:
+        serve_webhook(args, 0)
+        return
+
+    # spawn: bola jarayonlar ota jarayonning DB oqimi va ulanishini meros qilib olmaydi
+    ctx = multiprocessing.get_context("spawn")
+    procs = [ctx.Process(target=serve_webhook, args=(args, i), name=f"bot-worker-{i}")
+             for i in range(args.workers)]
+    for p in procs:
+        p.start()
+    try:
+        for p in procs:
+            p.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for p in procs:
+            if p.is_alive():
+                p.terminate()
+        for p in procs:
+            p.join()
+
+def main():
+    parser = argparse.ArgumentParser(description="AudioAI Telegram bot")
+    parser.add_argument("--mode", choices=("polling", "webhook"), default="polling")
+    parser.add_argument("--workers", type=int, default=1, help="webhook jarayonlari soni")
+    parser.add_argument("--host", default=WEBHOOK_HOST)
+    parser.add_argument("--port", type=int, default=WEBHOOK_PORT)
+    parser.add_argument("--path", default=WEBHOOK_PATH)
+    parser.add_argument("--webhook-url", help="tashqi manzil (https://...); berilsa set_webhook chaqiriladi")
+    parser.add_argument("--secret", default=WEBHOOK_SECRET)
+    args = parser.parse_args()
+
+    if args.workers < 1:
+        parser.error("--workers kamida 1 bo'lishi kerak")
+    if args.mode == "polling" and args.workers > 1:
+        # Bir nechta getUpdates iste'molchisi bir-birining update'larini "o'g'irlaydi"
+        parser.error("polling rejimi faqat bitta worker bilan ishlaydi; --mode webhook dan foydalaning")
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stdout)
+    if args.mode == "polling":
+        asyncio.run(run_polling())
+    else:
+        run_webhook(args)
+
+if __name__ == "__main__":
+    main()
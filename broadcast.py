@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import time
+
+from aiogram import Bot
+from aiogram.exceptions import (TelegramAPIError, TelegramRetryAfter, TelegramForbiddenError, TelegramBadRequest,
+                                TelegramNetworkError, TelegramServerError)
+
+from config import (BROADCAST_RATE, BROADCAST_CONCURRENCY, BROADCAST_PAGE_SIZE, BROADCAST_RETRIES,
+                    BROADCAST_CHAT_INTERVAL)
+from progress import progress
+from database import (get_users_page, count_active_users, deactivate_user, create_broadcast,
+                      save_broadcast_progress, get_unfinished_broadcasts)
+
+class TokenBucket:
+    """Oddiy token bucket: soniyasiga `rate` ta so'rov, `capacity` gacha portlash."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def pause(self, seconds):
+        """Telegram RetryAfter qaytarsa - barcha yuborishlarni to'xtatib turish."""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                await asyncio.sleep(self.blocked_until - now)
+                continue
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+# Ishlayotgan broadcast vazifalari (GC tomonidan yo'qolib ketmasligi uchun)
+_running = set()
+
+async def _send_one(bot, bucket, user_id, from_chat_id, message_id):
+    """
+    Bitta foydalanuvchiga yuborish. Natija: 'sent', 'blocked' yoki 'failed'.
+    Umumiy limit - bucket; chat limiti (~1 xabar/soniya) faqat qayta urinishlarda kerak,
+    chunki har bir chatga broadcast davomida bitta xabar boradi.
+    """
+    last_attempt = None
+    try:
+        for attempt in range(BROADCAST_RETRIES + 1):
+            if last_attempt is not None:
+                wait = last_attempt + BROADCAST_CHAT_INTERVAL - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            await bucket.acquire()
+            last_attempt = time.monotonic()
+            try:
+                await bot.copy_message(chat_id=user_id, from_chat_id=from_chat_id, message_id=message_id)
+                return "sent"
+            except TelegramRetryAfter as e:
+                bucket.pause(e.retry_after)
+            except TelegramForbiddenError:
+                await deactivate_user(user_id)
+                return "blocked"
+            except TelegramBadRequest as e:
+                if "chat not found" in str(e).lower():
+                    await deactivate_user(user_id)
+                    return "blocked"
+                logging.warning("Broadcast %s: %s", user_id, e)
+                return "failed"
+            except (TelegramNetworkError, TelegramServerError):
+                # Vaqtinchalik nosozlik (tarmoq yoki Telegram 5xx) - qayta urinish
+                await asyncio.sleep(attempt + 1)
+            except TelegramAPIError as e:
+                logging.warning("Broadcast %s: %s", user_id, e)
+                return "failed"
+    except Exception:
+        # Bitta chatdagi kutilmagan xato butun broadcast'ni to'xtatmasligi kerak
+        logging.exception("Broadcast %s: kutilmagan xato", user_id)
+        return "failed"
+    return "failed"
+
+async def run_broadcast(bot: Bot, broadcast_id, from_chat_id, message_id, status_chat_id,
+                        last_user_id=0, sent=0, failed=0, blocked=0):
+    """
+    Foydalanuvchilarni sahifalab o'qib, token bucket ostida parallel yuborish.
+    Har bir sahifadan so'ng holat bazaga yoziladi: uzilib qolsa, oxirgi saqlangan
+    sahifadan davom etadi (bitta sahifa ichidagilar ikki marta olishi mumkin).
+    """
+    bucket = TokenBucket(BROADCAST_RATE, BROADCAST_RATE)
+    semaphore = asyncio.Semaphore(BROADCAST_CONCURRENCY)
+    total = sent + failed + blocked + await count_active_users(last_user_id)
+    status_msg = await bot.send_message(status_chat_id, f"⏳ Yuborilmoqda: {sent}/{total}")
+    prog = progress.track(status_msg)
+
+    async def send(user_id):
+        async with semaphore:
+            return await _send_one(bot, bucket, user_id, from_chat_id, message_id)
+
+    while True:
+        page = await get_users_page(last_user_id, BROADCAST_PAGE_SIZE)
+        if not page:
+            break
+        for result in await asyncio.gather(*(send(u) for u in page)):
+            if result == "sent":
+                sent += 1
+            elif result == "blocked":
+                blocked += 1
+            else:
+                failed += 1
+        last_user_id = page[-1]
+        await save_broadcast_progress(broadcast_id, last_user_id, sent, failed, blocked)
+        prog.update(f"⏳ Yuborilmoqda: {sent + failed + blocked}/{total}\n"
+                    f"✅ {sent} | 🚫 {blocked} | ❌ {failed}")
+
+    await save_broadcast_progress(broadcast_id, last_user_id, sent, failed, blocked, status="done")
+    await bot.send_message(status_chat_id, f"✅ Tugadi. {sent} ta foydalanuvchiga yetkazildi.\n"
+                                           f"🚫 Bloklagan: {blocked} | ❌ Xato: {failed}")
+
+def _on_done(task):
+    _running.discard(task)
+    if not task.cancelled() and task.exception():
+        # Holat 'running' bo'lib qoladi - keyingi ishga tushishda davom ettiriladi
+        logging.error("Broadcast to'xtadi: %s", task.exception())
+
+def _spawn(coro):
+    task = asyncio.create_task(coro)
+    _running.add(task)
+    task.add_done_callback(_on_done)
+    return task
+
+async def start_broadcast(bot: Bot, from_chat_id, message_id, status_chat_id):
+    broadcast_id = await create_broadcast(from_chat_id, message_id, status_chat_id)
+    return _spawn(run_broadcast(bot, broadcast_id, from_chat_id, message_id, status_chat_id))
+
+async def resume_broadcasts(bot: Bot):
+    """Bot qayta ishga tushganda tugallanmagan broadcast'larni davom ettirish."""
+    for row in await get_unfinished_broadcasts():
+        broadcast_id, from_chat_id, message_id, status_chat_id, last_user_id, sent, failed, blocked = row
+        logging.info("Broadcast #%s davom ettirilmoqda (oxirgi user_id=%s)", broadcast_id, last_user_id)
+        _spawn(run_broadcast(bot, broadcast_id, from_chat_id, message_id, status_chat_id,
+                             last_user_id, sent, failed, blocked))
@@ -1,12 +1,128 @@
-import streamlit as st
+import os
+import sys
 
-try:
-    BOT_TOKEN = st.secrets["BOT_TOKEN"]
-except (KeyError, FileNotFoundError):
-    BOT_TOKEN = "YOUR_BOT_TOKEN_HERE"
+# --- Maxfiy sozlamalar: muhit o'zgaruvchisi -> secrets.toml -> st.secrets (faqat Streamlit ichida) ---
+# Bot jarayonlari Streamlit'ni import qilmaydi: u sekin yuklanadi va faqat dashboard'ga kerak.
 
-ADMIN_ID = 1416457518
+SECRETS_FILE = os.environ.get("SECRETS_FILE", os.path.join(".streamlit", "secrets.toml"))
+
+def _load_secrets_file(path):
+    if not os.path.exists(path):
+        return {}
+    try:
+        import tomllib
+    except ImportError:  # Python < 3.11
+        return {}
+    try:
+        with open(path, "rb") as f:
+            return tomllib.load(f)
+    except (FileNotFoundError, tomllib.TOMLDecodeError):
+        return {}
+
+_file_secrets = _load_secrets_file(SECRETS_FILE)
+
+def _secret(name, default=""):
+    value = os.environ.get(name)
+    if value:
+        return value
+    if name in _file_secrets:
+        return str(_file_secrets[name])
+    if "streamlit" in sys.modules:
+        try:
+            return str(sys.modules["streamlit"].secrets[name])
+        except (KeyError, FileNotFoundError):
+            pass
+    return default
+
+BOT_TOKEN = _secret("BOT_TOKEN", "YOUR_BOT_TOKEN_HERE")
+
+# Webhook rejimi (bot.py --mode webhook)
+WEBHOOK_HOST = "0.0.0.0"
+WEBHOOK_PORT = int(_secret("WEBHOOK_PORT", "8080"))
+WEBHOOK_PATH = "/webhook"
+WEBHOOK_SECRET = _secret("WEBHOOK_SECRET")
+
+# Dashboard botni o'zi ishga tushirsinmi; bot alohida (bot.py) ishlasa - 0, faqat monitor
+DASHBOARD_RUN_BOT = os.environ.get("DASHBOARD_RUN_BOT", "1") != "0"
+
+ADMIN_ID = int(_secret("ADMIN_ID", "1416457518"))
 DB_FILE = "bot_database.db"
+STATS_FLUSH_INTERVAL = 10  # soniya: foydalanish hodisalari shu oraliqda bazaga yoziladi
+ANALYTICS_RETENTION_DAYS = 90  # xom hodisalar va soatlik agregatlar muddati (kunlik agregatlar doimiy)
+TRANSLATION_CACHE_DAYS = 30    # tarjima keshi yozuvlari shuncha kundan keyin o'chiriladi
+
+# TTS sozlamalari
+TTS_RATE = "-10%"
+TTS_CONCURRENCY = 8        # barcha foydalanuvchilar uchun bir vaqtdagi edge-tts so'rovlari
+AUDIO_SPILL_BYTES = 8 * 1024 * 1024  # shundan katta audio xotiradan vaqtinchalik faylga o'tadi
+
+# Metrikalar: har bir bosqich uchun saqlanadigan oxirgi o'lchovlar soni (p50/p95/p99 uchun)
+METRICS_WINDOW = 2048
+
+# Provayder chaqiruvlari (resilience.py). Muddatlar 1000 belgilik birlik uchun:
+# 3000 belgili matnga TTS_ATTEMPT_TIMEOUT * 4 soniya beriladi
+TTS_ATTEMPT_TIMEOUT = 20
+TTS_RETRIES = 2
+TRANSLATE_ATTEMPT_TIMEOUT = 10
+TRANSLATE_RETRIES = 2
+RETRY_BACKOFF = 0.5        # soniya; kutish tasodifiy [0, backoff * 2^urinish], RETRY_BACKOFF_MAX gacha
+RETRY_BACKOFF_MAX = 8
+HEDGE_MIN_DELAY = 1.0      # p95 shundan kichik bo'lsa ham hedge kamida shuncha kutadi
+HEDGE_MAX_RATIO = 0.1      # hedge'lar chaqiruvlarning ko'pi bilan 10% i
+BREAKER_THRESHOLD = 5      # ketma-ket xatolar
+BREAKER_RESET = 30         # soniya: ochiq holatda turish vaqti
+
+# Progress xabarlari: bitta chatda ikki tahrir orasidagi eng kam vaqt (soniya)
+PROGRESS_MIN_INTERVAL = 1.5
+
+# Ommaviy xabar: Telegram umumiy limiti ~30 xabar/soniya
+BROADCAST_RATE = 25
+BROADCAST_CONCURRENCY = 20
+BROADCAST_PAGE_SIZE = 200
+BROADCAST_RETRIES = 3
+# Bitta chatga ~1 xabar/soniya: qayta urinishlar orasidagi eng kam vaqt (soniya)
+BROADCAST_CHAT_INTERVAL = 1.0
+
+# Umumiy ishlar navbati (scheduler.py)
+SCHEDULER_WORKERS = 4
+SCHEDULER_MAX_PENDING = 200
+SCHEDULER_PER_USER_INFLIGHT = 1
+# Audiokitob butun kitob davomida worker'ni band qiladi - ular uchun alohida chegara,
+# qolgan worker'lar qisqa ishlarga qoladi
+SCHEDULER_BOOK_WORKERS = 2
+
+# Audiokitob rejimi: shundan uzun matnlar qismlarga bo'linib, navbatma-navbat yuboriladi
+AUDIOBOOK_MIN_CHARS = 30_000
+AUDIOBOOK_PART_CHARS = 15_000
+AUDIOBOOK_FIRST_PART_CHARS = 1_500  # birinchi qism kichik - birinchi audio bir necha soniyada keladi
+AUDIOBOOK_CANCEL_POLL = 2.0  # soniya: boshqa worker'da bosilgan "to'xtatish" bazadan tekshiriladi
+
+# Hujjatlardan matn olish (extraction.py)
+EXTRACT_WORKERS = 2
+EXTRACT_TIMEOUT = 60              # soniya, bitta hujjat uchun
+EXTRACT_MAX_PAGES = 500
+EXTRACT_MAX_CHARS = 1_000_000
+EXTRACT_MAX_BYTES = 20 * 1024 * 1024  # Telegram bot API yuklab olish chegarasi
+EXTRACT_PAGE_BATCH = 20           # bitta jarayon chaqiruvidagi PDF sahifalari
+
+# Tarjima: provayder cheklovi va parallel oqimlar soni
+TRANSLATE_CHUNK_LIMIT = 4500
+TRANSLATE_CONCURRENCY = 4
+
+# Tayyor audiolar keshi (MP3 baytlari diskda, file_id esa bazada)
+AUDIO_CACHE_DIR = "audio_cache"
+AUDIO_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+# FSM holatlari (storage.py): SQLite'da siqilgan holda saqlanadi
+FSM_TTL = 24 * 3600                       # soniya: shundan eski holatlar o'chiriladi
+FSM_PURGE_INTERVAL = 15 * 60
+FSM_MAX_BYTES_PER_USER = 4 * 1024 * 1024  # bitta foydalanuvchi uchun siqilgan baytlar chegarasi
+FSM_CACHE_BYTES = 16 * 1024 * 1024        # jarayon ichidagi LRU hajmi (0 - o'chirilgan)
+
+# Ovoz namunalari (SINOV REJIMI) bir marta yuklanadigan chat
+PREVIEW_CHAT_ID = int(_secret("PREVIEW_CHAT_ID", str(ADMIN_ID)))
+PREVIEW_RETRY_BASE = 30       # soniya: muvaffaqiyatsiz tayyorlashdan keyingi birinchi kutish
+PREVIEW_RETRY_MAX = 15 * 60   # kutish har safar ikki baravar, shu chegaragacha
 
 VOICES = {
     "multi": {
@@ -1,66 +1,427 @@
+import asyncio
+import logging
 import sqlite3
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, date
-from config import DB_FILE
+from config import DB_FILE, STATS_FLUSH_INTERVAL, ANALYTICS_RETENTION_DAYS, TRANSLATION_CACHE_DAYS
+from metrics import metrics
 
-def init_db():
-    conn = sqlite3.connect(DB_FILE)
+# --- Ulanish: bitta uzoq yashovchi WAL ulanish va unga xizmat qiluvchi yagona oqim ---
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+_conn = None
+
+def _connection():
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(DB_FILE, check_same_thread=False)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("PRAGMA synchronous=NORMAL")
+        _conn.execute("PRAGMA busy_timeout=5000")
+    return _conn
+
+def _call(fn, args):
+    conn = _connection()
+    try:
+        return fn(conn, *args)
+    except Exception:
+        conn.rollback()
+        raise
+
+async def run_db(fn, *args):
+    """fn(conn, *args) ni DB oqimida bajarish (event loop bloklanmaydi)."""
+    loop = asyncio.get_running_loop()
+    with metrics.stage("db"):
+        return await loop.run_in_executor(_executor, _call, fn, args)
+
+def run_db_sync(fn, *args):
+    """Event loop'dan tashqaridagi oqimlar uchun (masalan, tarjima pool'i yoki ishga tushirish)."""
+    return _executor.submit(_call, fn, args).result()
+
+def _init_db(conn):
     c = conn.cursor()
     c.execute('''CREATE TABLE IF NOT EXISTS users
                  (user_id INTEGER PRIMARY KEY, username TEXT, fullname TEXT, join_date TEXT)''')
+    # Eski bazalar uchun: botni bloklagan foydalanuvchilar belgisi
+    columns = [row[1] for row in c.execute("PRAGMA table_info(users)")]
+    if "active" not in columns:
+        c.execute("ALTER TABLE users ADD COLUMN active INTEGER NOT NULL DEFAULT 1")
     c.execute('''CREATE TABLE IF NOT EXISTS stats
                  (date TEXT, usage_count INTEGER)''')
+    # ON CONFLICT(date) upsert uchun
+    c.execute('''CREATE UNIQUE INDEX IF NOT EXISTS idx_stats_date ON stats(date)''')
+    c.execute('''CREATE TABLE IF NOT EXISTS audio_cache
+                 (cache_key TEXT PRIMARY KEY, file_id TEXT, created TEXT)''')
+    c.execute('''CREATE TABLE IF NOT EXISTS translation_cache
+                 (chunk_hash TEXT, lang TEXT, translated TEXT, created REAL NOT NULL DEFAULT 0,
+                  PRIMARY KEY (chunk_hash, lang))''')
+    # Eski bazalar uchun: yozuv vaqti (muddati o'tgan tarjimalar kunlik tozalashda o'chiriladi)
+    columns = [row[1] for row in c.execute("PRAGMA table_info(translation_cache)")]
+    if "created" not in columns:
+        c.execute("ALTER TABLE translation_cache ADD COLUMN created REAL NOT NULL DEFAULT 0")
+        c.execute("UPDATE translation_cache SET created = ?", (time.time(),))
+    c.execute('''CREATE INDEX IF NOT EXISTS idx_translation_created ON translation_cache(created)''')
+    c.execute('''CREATE TABLE IF NOT EXISTS broadcasts
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT, from_chat_id INTEGER, message_id INTEGER,
+                  status_chat_id INTEGER, last_user_id INTEGER DEFAULT 0, sent INTEGER DEFAULT 0,
+                  failed INTEGER DEFAULT 0, blocked INTEGER DEFAULT 0, status TEXT, started TEXT)''')
+    # Analitika: har bir ish - bitta hodisa; o'qish faqat agregatlar (rollup) va hisoblagichlardan
+    c.execute('''CREATE TABLE IF NOT EXISTS events
+                 (id INTEGER PRIMARY KEY, ts REAL, user_id INTEGER, lang TEXT, voice TEXT, mode TEXT,
+                  text_len INTEGER, audio_bytes INTEGER, duration REAL, ok INTEGER)''')
+    c.execute('''CREATE INDEX IF NOT EXISTS idx_events_ts ON events(ts)''')
+    for table, period in (("rollup_hourly", "hour"), ("rollup_daily", "day")):
+        c.execute(f'''CREATE TABLE IF NOT EXISTS {table}
+                     ({period} TEXT, lang TEXT, voice TEXT, mode TEXT, jobs INTEGER, failures INTEGER,
+                      text_chars INTEGER, audio_bytes INTEGER, duration REAL,
+                      PRIMARY KEY ({period}, lang, voice, mode))''')
+    c.execute('''CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER)''')
+    # Bir martalik ko'chirish: eski kunlik statistika va foydalanuvchilar soni hisoblagichlarga
+    if c.execute("SELECT 1 FROM counters WHERE name = 'jobs'").fetchone() is None:
+        c.execute('''INSERT INTO rollup_daily SELECT date, '-', '-', 'legacy', usage_count, 0, 0, 0, 0
+                     FROM stats WHERE usage_count > 0''')
+        c.execute("INSERT INTO counters SELECT 'jobs', COALESCE(SUM(usage_count), 0) FROM stats")
+        c.execute("INSERT INTO counters SELECT 'users', COUNT(*) FROM users")
+    # Ovoz namunalari (previews.py): digest o'zgarsa namuna qayta sintez qilinadi
+    c.execute('''CREATE TABLE IF NOT EXISTS voice_previews
+                 (lang TEXT, voice_key TEXT, digest TEXT, file_id TEXT, PRIMARY KEY (lang, voice_key))''')
+    # FSM holatlari (storage.py): data - siqilgan JSON, size - uning baytlardagi hajmi
+    c.execute('''CREATE TABLE IF NOT EXISTS fsm_states
+                 (key TEXT PRIMARY KEY, user_id INTEGER, state TEXT, data BLOB,
+                  size INTEGER NOT NULL DEFAULT 0, updated REAL)''')
+    c.execute('''CREATE INDEX IF NOT EXISTS idx_fsm_user ON fsm_states(user_id)''')
+    c.execute('''CREATE INDEX IF NOT EXISTS idx_fsm_updated ON fsm_states(updated)''')
+    # Faol audiokitoblar (audiobook.py): boshqa worker'da bosilgan "to'xtatish" shu yerga yoziladi
+    c.execute('''CREATE TABLE IF NOT EXISTS audiobooks
+                 (user_id INTEGER PRIMARY KEY, cancel INTEGER NOT NULL DEFAULT 0)''')
     conn.commit()
-    conn.close()
 
-def add_user(user_id, username, fullname):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("SELECT user_id FROM users WHERE user_id = ?", (user_id,))
-    if c.fetchone() is None:
-        join_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        c.execute("INSERT INTO users VALUES (?, ?, ?, ?)", (user_id, username, fullname, join_date))
+def init_db():
+    run_db_sync(_init_db)
+
+# --- Foydalanuvchilar ---
+
+def _add_user(conn, user_id, username, fullname):
+    join_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    cur = conn.execute('''INSERT INTO users (user_id, username, fullname, join_date) VALUES (?, ?, ?, ?)
+                          ON CONFLICT(user_id) DO NOTHING''',
+                       (user_id, username, fullname, join_date))
+    if cur.rowcount == 1:
+        conn.execute("UPDATE counters SET value = value + 1 WHERE name = 'users'")
         conn.commit()
-        conn.close()
         return True, join_date
-    conn.close()
+    # Qaytib kelgan foydalanuvchi yana xabar olishi mumkin
+    conn.execute("UPDATE users SET active = 1 WHERE user_id = ? AND active = 0", (user_id,))
+    conn.commit()
     return False, None
 
-def get_all_users():
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("SELECT user_id FROM users")
-    users = [row[0] for row in c.fetchall()]
-    conn.close()
-    return users
-def update_stats():
-    today = str(date.today())
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    # 1. Bugungi sanaga tegishli qator borligini tekshirish
-    c.execute("SELECT usage_count FROM stats WHERE date = ?", (today,))
-    result = c.fetchone()
-    
-    if result:
-        # 2. Agar bo'lsa, sonini 1 taga oshirish (so'rov oxirida (today,) bo'lishi shart)
-        c.execute("UPDATE stats SET usage_count = usage_count + 1 WHERE date = ?", (today,))
-    else:
-        # 3. Agar bo'lmasa, yangi qator qo'shish (bu yerda ham (today,) bo'lishi shart)
-        c.execute("INSERT INTO stats VALUES (?, 1)", (today,))
-        
-    conn.commit()
-    conn.close()
-
-def get_stats():
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    today = str(date.today())
-    c.execute("SELECT COUNT(*) FROM users")
-    total_users = c.fetchone()[0]
-    c.execute("SELECT usage_count FROM stats WHERE date = ?", (today,))
-    res = c.fetchone()
-    today_usage = res[0] if res else 0
-    c.execute("SELECT SUM(usage_count) FROM stats")
-    total_usage = c.fetchone()[0]
-    conn.close()
-    return total_users, today_usage, (total_usage if total_usage else 0)
+async def add_user(user_id, username, fullname):
+    return await run_db(_add_user, user_id, username, fullname)
+
+def _get_users_page(conn, after_user_id, limit):
+    rows = conn.execute("SELECT user_id FROM users WHERE active = 1 AND user_id > ? ORDER BY user_id LIMIT ?",
+                        (after_user_id, limit))
+    return [row[0] for row in rows]
+
+async def get_users_page(after_user_id, limit):
+    """Faol foydalanuvchilarni user_id bo'yicha sahifalab olish (keyset pagination)."""
+    return await run_db(_get_users_page, after_user_id, limit)
+
+def _count_active_users(conn, after_user_id):
+    return conn.execute("SELECT COUNT(*) FROM users WHERE active = 1 AND user_id > ?", (after_user_id,)).fetchone()[0]
+
+async def count_active_users(after_user_id=0):
+    return await run_db(_count_active_users, after_user_id)
+
+def _deactivate_user(conn, user_id):
+    conn.execute("UPDATE users SET active = 0 WHERE user_id = ?", (user_id,))
+    conn.commit()
+
+async def deactivate_user(user_id):
+    await run_db(_deactivate_user, user_id)
+
+# --- Ommaviy xabarlar (broadcast) holati ---
+
+def _create_broadcast(conn, from_chat_id, message_id, status_chat_id):
+    started = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    cur = conn.execute('''INSERT INTO broadcasts (from_chat_id, message_id, status_chat_id, status, started)
+                          VALUES (?, ?, ?, 'running', ?)''', (from_chat_id, message_id, status_chat_id, started))
+    conn.commit()
+    return cur.lastrowid
+
+async def create_broadcast(from_chat_id, message_id, status_chat_id):
+    return await run_db(_create_broadcast, from_chat_id, message_id, status_chat_id)
+
+def _save_broadcast_progress(conn, broadcast_id, last_user_id, sent, failed, blocked, status):
+    conn.execute('''UPDATE broadcasts SET last_user_id = ?, sent = ?, failed = ?, blocked = ?, status = ?
+                    WHERE id = ?''', (last_user_id, sent, failed, blocked, status, broadcast_id))
+    conn.commit()
+
+async def save_broadcast_progress(broadcast_id, last_user_id, sent, failed, blocked, status="running"):
+    await run_db(_save_broadcast_progress, broadcast_id, last_user_id, sent, failed, blocked, status)
+
+def _get_unfinished_broadcasts(conn):
+    rows = conn.execute('''SELECT id, from_chat_id, message_id, status_chat_id, last_user_id, sent, failed, blocked
+                           FROM broadcasts WHERE status = 'running' ORDER BY id''')
+    return rows.fetchall()
+
+async def get_unfinished_broadcasts():
+    return await run_db(_get_unfinished_broadcasts)
+
+# --- Analitika: hodisalar xotiradagi buferga yoziladi va davriy ravishda to'plam bo'lib saqlanadi ---
+# Har bir to'plam bilan birga soatlik/kunlik agregatlar va umumiy hisoblagichlar ham yangilanadi,
+# shuning uchun statistika so'rovlari tarix hajmiga bog'liq emas.
+
+_pending_events = []
+_last_prune_day = None
+
+def record_job(user_id, lang, voice, mode, text_len, audio_bytes, duration, ok=True):
+    _pending_events.append((time.time(), user_id, lang, voice, mode, text_len, audio_bytes, duration, int(ok)))
+    if ok:
+        metrics.job_done()
+
+def _rollup(batch, period_fmt):
+    rows = defaultdict(lambda: [0, 0, 0, 0, 0.0])
+    for ts, _, lang, voice, mode, text_len, audio_bytes, duration, ok in batch:
+        period = datetime.fromtimestamp(ts).strftime(period_fmt)
+        row = rows[(period, lang, voice, mode)]
+        row[0] += 1
+        row[1] += 1 - ok
+        row[2] += text_len
+        row[3] += audio_bytes
+        row[4] += duration
+    return [key + tuple(values) for key, values in rows.items()]
+
+def _flush_events(conn, batch, prune_before, translations_before=None):
+    conn.executemany('''INSERT INTO events (ts, user_id, lang, voice, mode, text_len, audio_bytes, duration, ok)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''', batch)
+    for table, period, fmt in (("rollup_hourly", "hour", "%Y-%m-%d %H:00"), ("rollup_daily", "day", "%Y-%m-%d")):
+        conn.executemany(f'''INSERT INTO {table} VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                             ON CONFLICT({period}, lang, voice, mode) DO UPDATE SET
+                                 jobs = jobs + excluded.jobs, failures = failures + excluded.failures,
+                                 text_chars = text_chars + excluded.text_chars,
+                                 audio_bytes = audio_bytes + excluded.audio_bytes,
+                                 duration = duration + excluded.duration''',
+                         _rollup(batch, fmt))
+    conn.execute("UPDATE counters SET value = value + ? WHERE name = 'jobs'", (sum(e[8] for e in batch),))
+    if prune_before is not None:
+        # Xom hodisalar cheklangan muddat saqlanadi; agregatlar esa doimiy
+        conn.execute("DELETE FROM events WHERE ts < ?", (prune_before,))
+        conn.execute("DELETE FROM rollup_hourly WHERE hour < ?",
+                     (datetime.fromtimestamp(prune_before).strftime("%Y-%m-%d %H:00"),))
+    if translations_before is not None:
+        conn.execute("DELETE FROM translation_cache WHERE created < ?", (translations_before,))
+    conn.commit()
+
+async def flush_stats():
+    global _last_prune_day
+    if not _pending_events:
+        return
+    batch = _pending_events[:]
+    _pending_events.clear()
+    today = date.today()
+    prune_before = translations_before = None
+    if _last_prune_day != today:
+        # Tarjimalar faqat ishlar bilan paydo bo'ladi - ishlar hodisalari bilan birga tozalash yetarli
+        prune_before = time.time() - ANALYTICS_RETENTION_DAYS * 86400
+        translations_before = time.time() - TRANSLATION_CACHE_DAYS * 86400
+    try:
+        await run_db(_flush_events, batch, prune_before, translations_before)
+        _last_prune_day = today
+    except Exception as e:
+        # Yozib bo'lmadi - keyingi urinishgacha hodisalarni qaytarish
+        _pending_events[:0] = batch
+        logging.error("Statistikani yozib bo'lmadi: %s", e)
+
+async def stats_flusher(interval=STATS_FLUSH_INTERVAL):
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            await flush_stats()
+    finally:
+        await flush_stats()
+
+def _get_stats(conn):
+    counters = dict(conn.execute("SELECT name, value FROM counters"))
+    today_usage = conn.execute("SELECT COALESCE(SUM(jobs - failures), 0) FROM rollup_daily WHERE day = ?",
+                               (str(date.today()),)).fetchone()[0]
+    return counters.get("users", 0), today_usage, counters.get("jobs", 0)
+
+async def get_stats():
+    total_users, today_usage, total_usage = await run_db(_get_stats)
+    # Hali yozilmagan hodisalarni ham qo'shish
+    ok = sum(e[8] for e in _pending_events)
+    return total_users, today_usage + ok, total_usage + ok
+
+def get_stats_sync():
+    """Boshqa jarayondagi bot uchun (dashboard): faqat bazaga yozilgan qiymatlar."""
+    return run_db_sync(_get_stats)
+
+def _get_breakdown(conn, day, since_hour):
+    """Kunlik kesim (til/ovoz/rejim) va oxirgi soatlar bo'yicha ishlar soni."""
+    rows = conn.execute('''SELECT lang, voice, mode, jobs, failures, text_chars, audio_bytes, duration
+                            FROM rollup_daily WHERE day = ?''', (day,)).fetchall()
+    hourly = conn.execute('''SELECT hour, SUM(jobs), SUM(failures), SUM(duration) FROM rollup_hourly
+                              WHERE hour >= ? GROUP BY hour ORDER BY hour''', (since_hour,)).fetchall()
+    return rows, hourly
+
+def _breakdown_args(hours):
+    since = datetime.fromtimestamp(time.time() - hours * 3600).strftime("%Y-%m-%d %H:00")
+    return str(date.today()), since
+
+async def get_breakdown(hours=24):
+    return await run_db(_get_breakdown, *_breakdown_args(hours))
+
+def get_breakdown_sync(hours=24):
+    return run_db_sync(_get_breakdown, *_breakdown_args(hours))
+
+# --- Audio kesh: kalit -> Telegram file_id ---
+
+def _get_cached_file_id(conn, cache_key):
+    res = conn.execute("SELECT file_id FROM audio_cache WHERE cache_key = ?", (cache_key,)).fetchone()
+    return res[0] if res else None
+
+async def get_cached_file_id(cache_key):
+    return await run_db(_get_cached_file_id, cache_key)
+
+def _save_cached_file_id(conn, cache_key, file_id):
+    created = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    conn.execute('''INSERT INTO audio_cache VALUES (?, ?, ?)
+                    ON CONFLICT(cache_key) DO UPDATE SET file_id = excluded.file_id, created = excluded.created''',
+                 (cache_key, file_id, created))
+    conn.commit()
+
+async def save_cached_file_id(cache_key, file_id):
+    await run_db(_save_cached_file_id, cache_key, file_id)
+
+def _delete_cached_file_id(conn, cache_key):
+    conn.execute("DELETE FROM audio_cache WHERE cache_key = ?", (cache_key,))
+    conn.commit()
+
+async def delete_cached_file_id(cache_key):
+    await run_db(_delete_cached_file_id, cache_key)
+
+# --- Tarjima keshi: (bo'lak xeshi, til) -> tarjima ---
+# Bu funksiyalar tarjima pool'i oqimlaridan chaqiriladi, shuning uchun sinxron.
+
+def _get_cached_translation(conn, chunk_hash, lang):
+    res = conn.execute("SELECT translated FROM translation_cache WHERE chunk_hash = ? AND lang = ?",
+                       (chunk_hash, lang)).fetchone()
+    return res[0] if res else None
+
+def get_cached_translation(chunk_hash, lang):
+    return run_db_sync(_get_cached_translation, chunk_hash, lang)
+
+def _save_cached_translation(conn, chunk_hash, lang, translated):
+    conn.execute('''INSERT INTO translation_cache (chunk_hash, lang, translated, created) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(chunk_hash, lang) DO UPDATE SET translated = excluded.translated,
+                                                                created = excluded.created''',
+                 (chunk_hash, lang, translated, time.time()))
+    conn.commit()
+
+def save_cached_translation(chunk_hash, lang, translated):
+    run_db_sync(_save_cached_translation, chunk_hash, lang, translated)
+
+# --- Ovoz namunalari (previews.py) ---
+
+def _get_voice_previews(conn):
+    return conn.execute("SELECT lang, voice_key, digest, file_id FROM voice_previews").fetchall()
+
+async def get_voice_previews():
+    return await run_db(_get_voice_previews)
+
+def _save_voice_preview(conn, lang, voice_key, digest, file_id):
+    conn.execute('''INSERT INTO voice_previews VALUES (?, ?, ?, ?)
+                    ON CONFLICT(lang, voice_key) DO UPDATE SET digest = excluded.digest, file_id = excluded.file_id''',
+                 (lang, voice_key, digest, file_id))
+    conn.commit()
+
+async def save_voice_preview(lang, voice_key, digest, file_id):
+    await run_db(_save_voice_preview, lang, voice_key, digest, file_id)
+
+def _delete_voice_previews(conn, keys):
+    conn.executemany("DELETE FROM voice_previews WHERE lang = ? AND voice_key = ?", keys)
+    conn.commit()
+
+async def delete_voice_previews(keys):
+    await run_db(_delete_voice_previews, keys)
+
+# --- Audiokitoblar (audiobook.py) ---
+
+def _register_audiobook(conn, user_id):
+    conn.execute("INSERT OR REPLACE INTO audiobooks (user_id, cancel) VALUES (?, 0)", (user_id,))
+    conn.commit()
+
+async def register_audiobook(user_id):
+    await run_db(_register_audiobook, user_id)
+
+def _finish_audiobook(conn, user_id):
+    conn.execute("DELETE FROM audiobooks WHERE user_id = ?", (user_id,))
+    conn.commit()
+
+async def finish_audiobook(user_id):
+    await run_db(_finish_audiobook, user_id)
+
+def _request_audiobook_cancel(conn, user_id):
+    cur = conn.execute("UPDATE audiobooks SET cancel = 1 WHERE user_id = ?", (user_id,))
+    conn.commit()
+    return cur.rowcount > 0
+
+async def request_audiobook_cancel(user_id):
+    """Boshqa worker'dagi audiokitobni to'xtatish so'rovi. Faol kitob bo'lmasa - False."""
+    return await run_db(_request_audiobook_cancel, user_id)
+
+def _audiobook_cancelled(conn, user_id):
+    row = conn.execute("SELECT cancel FROM audiobooks WHERE user_id = ?", (user_id,)).fetchone()
+    return bool(row and row[0])
+
+async def audiobook_cancelled(user_id):
+    return await run_db(_audiobook_cancelled, user_id)
+
+# --- FSM holatlari (storage.py) ---
+
+def _load_fsm(conn, key, cutoff):
+    return conn.execute("SELECT state, data FROM fsm_states WHERE key = ? AND updated >= ?",
+                        (key, cutoff)).fetchone()
+
+async def load_fsm(key, cutoff):
+    return await run_db(_load_fsm, key, cutoff)
+
+def _save_fsm_state(conn, key, user_id, state, now):
+    conn.execute('''INSERT INTO fsm_states (key, user_id, state, updated) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(key) DO UPDATE SET state = excluded.state, updated = excluded.updated''',
+                 (key, user_id, state, now))
+    conn.execute("DELETE FROM fsm_states WHERE key = ? AND state IS NULL AND size = 0", (key,))
+    conn.commit()
+
+async def save_fsm_state(key, user_id, state, now):
+    await run_db(_save_fsm_state, key, user_id, state, now)
+
+def _save_fsm_data(conn, key, user_id, blob, now, max_user_bytes):
+    """Foydalanuvchining boshqa kalitlari bilan birga chegaradan oshsa - yozmasdan False qaytaradi."""
+    size = len(blob) if blob else 0
+    if size:
+        used = conn.execute("SELECT COALESCE(SUM(size), 0) FROM fsm_states WHERE user_id = ? AND key <> ?",
+                            (user_id, key)).fetchone()[0]
+        if used + size > max_user_bytes:
+            return False
+    conn.execute('''INSERT INTO fsm_states (key, user_id, data, size, updated) VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(key) DO UPDATE SET data = excluded.data, size = excluded.size,
+                                                   updated = excluded.updated''',
+                 (key, user_id, blob, size, now))
+    conn.execute("DELETE FROM fsm_states WHERE key = ? AND state IS NULL AND size = 0", (key,))
+    conn.commit()
+    return True
+
+async def save_fsm_data(key, user_id, blob, now, max_user_bytes):
+    return await run_db(_save_fsm_data, key, user_id, blob, now, max_user_bytes)
+
+def _purge_fsm(conn, cutoff):
+    deleted = conn.execute("DELETE FROM fsm_states WHERE updated < ?", (cutoff,)).rowcount
+    conn.commit()
+    return deleted
 
+async def purge_fsm(cutoff):
+    return await run_db(_purge_fsm, cutoff)
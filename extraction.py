@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from config import (EXTRACT_WORKERS, EXTRACT_TIMEOUT, EXTRACT_MAX_PAGES, EXTRACT_MAX_CHARS,
+                    EXTRACT_MAX_BYTES, EXTRACT_PAGE_BATCH)
+
+class ExtractionError(Exception):
+    """Faylni o'qib bo'lmadi yoki u belgilangan chegaralardan oshdi."""
+
+# --- Alohida jarayonda ishlaydigan funksiyalar (faqat shu modul va kutubxonalar import qilinadi) ---
+
+# Jarayondagi oxirgi ochilgan PDF: har bir sahifa bloki uchun fayl qaytadan tahlil qilinmaydi
+_reader = (None, None)
+
+def _pdf_reader(path):
+    global _reader
+    st = os.stat(path)
+    key = (path, st.st_size, st.st_mtime_ns)
+    if _reader[0] != key:
+        import PyPDF2
+        _reader = (key, PyPDF2.PdfReader(path))
+    return _reader[1]
+
+def _pdf_page_count(path):
+    return len(_pdf_reader(path).pages)
+
+def _pdf_pages(path, start, stop):
+    reader = _pdf_reader(path)
+    return [(reader.pages[i].extract_text() or "") + "\n" for i in range(start, stop)]
+
+def _docx_paragraphs(path, max_chars):
+    from docx import Document
+    paragraphs, total = [], 0
+    for para in Document(path).paragraphs:
+        paragraphs.append(para.text + "\n")
+        total += len(para.text) + 1
+        if total >= max_chars:
+            break
+    return paragraphs
+
+def _txt_blocks(path, max_chars):
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        return [f.read(max_chars)]
+
+# --- Asosiy oqim tomoni ---
+
+# spawn: bot oqimlari bilan fork qilishdagi muammolarning oldini oladi
+_pool = None
+_pool_jobs = {}   # pool -> undagi tugallanmagan ishlar (concurrent Future)
+_killers = set()  # eski pool'larni o'ldirishni kutayotgan vazifalar
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=EXTRACT_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+def _submit(jobs, fn, *args):
+    """Ishni joriy pool'ga yuborish; jobs - shu hujjatning (pool, future) ro'yxati."""
+    pool = _get_pool()
+    fut = pool.submit(fn, *args)
+    pending = _pool_jobs.setdefault(pool, set())
+    pending.add(fut)
+    fut.add_done_callback(pending.discard)
+    jobs.append((pool, fut))
+    return fut
+
+def _retire(pool):
+    """Pool'ga yangi ish berilmaydi (keyingilari yangi pool'ga tushadi); navbatdagilar bajarilaveradi."""
+    global _pool
+    if pool is _pool:
+        _pool = None
+        pool.shutdown(wait=False)
+
+def _abandon(jobs):
+    """
+    Vaqti tugagan hujjat ishlarini to'xtatish. Qaysi jarayon bu hujjatni tahlil qilayotganini bilib
+    bo'lmaydi, shuning uchun uning pool'i iste'foga chiqariladi: boshqa hujjatlarning o'sha pool'dagi
+    ishlari tugagach, eski jarayonlar (osilib qolgani bilan birga) o'ldiriladi.
+    """
+    mine = {fut for _, fut in jobs}
+    for fut in mine:
+        fut.cancel()  # navbatda turganlari bajarilmaydi
+    for pool in {pool for pool, _ in jobs}:
+        if pool is not _pool and pool not in _pool_jobs:
+            continue  # allaqachon o'ldirilgan
+        processes = list((pool._processes or {}).values())
+        _retire(pool)
+        others = [fut for fut in _pool_jobs.get(pool, ()) if fut not in mine]
+        task = asyncio.create_task(_kill_when_idle(pool, processes, others))
+        _killers.add(task)
+        task.add_done_callback(_killers.discard)
+
+async def _kill_when_idle(pool, processes, others):
+    if others:
+        await asyncio.wait([asyncio.wrap_future(fut) for fut in others])
+    for proc in processes:
+        if proc.is_alive():
+            proc.terminate()
+    _pool_jobs.pop(pool, None)
+
+async def _wait(deadline, jobs, fut):
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(fut), max(deadline - time.monotonic(), 0))
+    except asyncio.TimeoutError:
+        _abandon(jobs)
+        raise ExtractionError("vaqt tugadi") from None
+
+async def _run(deadline, jobs, fn, *args):
+    if deadline <= time.monotonic():
+        raise ExtractionError("vaqt tugadi")
+    return await _wait(deadline, jobs, _submit(jobs, fn, *args))
+
+async def _iter_pdf(path, deadline, stats, jobs):
+    total_pages = await _run(deadline, jobs, _pdf_page_count, path)
+    pages = min(total_pages, EXTRACT_MAX_PAGES)
+    stats["total_pages"] = total_pages
+    if total_pages > pages:
+        stats["truncated"] = True
+    # Bir hujjatdan bir vaqtda EXTRACT_WORKERS tagacha blok - boshqa foydalanuvchilar fayllari
+    # butun PDF ortida navbat kutmaydi; natijalar tartib bilan qaytariladi
+    starts = iter(range(0, pages, EXTRACT_PAGE_BATCH))
+    window = deque()
+
+    def fill():
+        while len(window) < EXTRACT_WORKERS:
+            start = next(starts, None)
+            if start is None:
+                return
+            window.append(_submit(jobs, _pdf_pages, path, start, min(start + EXTRACT_PAGE_BATCH, pages)))
+
+    fill()
+    try:
+        while window:
+            batch = await _wait(deadline, jobs, window.popleft())
+            fill()
+            for page in batch:
+                stats["pages"] += 1
+                yield page
+    finally:
+        for fut in window:
+            fut.cancel()
+
+async def iter_document(path, ext, stats=None):
+    """
+    Hujjat matnini sahifa/paragraf bo'laklari sifatida qaytaruvchi async generator.
+    Tahlil jarayonlar pool'ida bajariladi; vaqt, sahifa va belgi chegaralari qo'llanadi.
+    stats lug'atiga sahifalar soni va sarflangan vaqt yoziladi; matn chegarada kesilgan
+    bo'lsa - truncated=True.
+    """
+    stats = stats if stats is not None else {}
+    stats.update(pages=0, chars=0, truncated=False, seconds=0.0)
+    if os.path.getsize(path) > EXTRACT_MAX_BYTES:
+        raise ExtractionError("fayl hajmi juda katta")
+
+    started = time.monotonic()
+    deadline = started + EXTRACT_TIMEOUT
+    jobs = []
+    try:
+        if ext == 'pdf':
+            pieces = _iter_pdf(path, deadline, stats, jobs)
+        elif ext == 'docx':
+            pieces = _iter_list(_run(deadline, jobs, _docx_paragraphs, path, EXTRACT_MAX_CHARS), stats)
+        elif ext == 'txt':
+            pieces = _iter_list(_run(deadline, jobs, _txt_blocks, path, EXTRACT_MAX_CHARS), stats)
+        else:
+            return
+
+        async for piece in pieces:
+            left = EXTRACT_MAX_CHARS - stats["chars"]
+            full = len(piece) >= left
+            if full:
+                stats["truncated"] = True
+                piece = piece[:left]
+            stats["chars"] += len(piece)
+            yield piece
+            if full:
+                await pieces.aclose()
+                break
+    except ExtractionError:
+        raise
+    except BrokenProcessPool as e:
+        # Jarayon qulab tushdi (masalan, xotira yetmadi) - keyingi so'rov uchun yangi pool
+        for pool, _ in jobs:
+            _retire(pool)
+        raise ExtractionError("faylni tahlil qilish jarayoni to'xtadi") from e
+    except Exception as e:
+        raise ExtractionError(str(e)) from e
+    finally:
+        stats["seconds"] = time.monotonic() - started
+        logging.info("Hujjat (%s): %d sahifa/bo'lak, %d belgi, %.2fs%s", ext, stats["pages"], stats["chars"],
+                     stats["seconds"], " (qisqartirildi)" if stats["truncated"] else "")
+
+async def _iter_list(coro, stats):
+    for piece in await coro:
+        stats["pages"] += 1
+        yield piece
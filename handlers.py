@@ -1,73 +1,42 @@
 import os
 import tempfile
-import asyncio
-import re
+import time
 import logging
 from aiogram import Router, types, F, Bot
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import FSInputFile
+from aiogram.exceptions import TelegramBadRequest
 
-from config import ADMIN_ID, VOICES
-from database import add_user, update_stats, get_stats, get_all_users
+from config import ADMIN_ID, VOICES, TTS_RATE, AUDIOBOOK_MIN_CHARS, EXTRACT_MAX_PAGES
+from database import add_user, record_job, get_stats, get_breakdown
 from keyboards import main_menu, admin_menu, lang_inline_kb, voices_inline_kb
-from utils import read_pdf, read_docx, read_txt, translate_text, generate_audio
+from utils import translate_text, generate_audio, synthesize_segments, tts_semaphore, AudioBuffer
+from audio_cache import audio_cache, make_cache_key, format_cache_stats
+from scheduler import scheduler, QueueFull, JobCancelled, UserBusy, format_scheduler_stats
+from broadcast import start_broadcast
+from extraction import iter_document, ExtractionError
+from audiobook import run_audiobook, cancel_audiobook
+from progress import progress, get_p_bar
+from segmenter import segment_text
+from mp3concat import concat_mp3
+from metrics import metrics
+from storage import StorageQuotaExceeded
+from resilience import format_resilience_stats
+from previews import send_previews, retry_refresh as retry_previews, invalidate as invalidate_previews
 
 router = Router()
 
 class BotStates(StatesGroup):
     waiting_for_broadcast = State()
 
-# --- 1. TILLARNI ANIQLASH MANTIQI ---
-
-def get_p_bar(percent):
-    filled = int(percent / 10)
-    bar = "▓" * filled + "░" * (10 - filled)
-    return f"<code>{bar}</code> {percent}%"
-
-def detect_language_by_chars(text):
-    """
-    Unicode diapazonlari orqali tillarni aniqlash.
-    """
-    # 1. Koreys tili (Hangul: U+AC00 - U+D7AF)
-    if re.search(r'[\uAC00-\uD7AF]', text):
-        return 'ko'
-    # 2. Arab tili
-    elif re.search(r'[\u0600-\u06FF]', text):
-        return 'ar'
-    # 3. Rus tili (Kirill)
-    elif re.search(r'[а-яА-ЯёЁ]', text):
-        return 'ru'
-    # 4. Turk tili (Lotin, lekin o'ziga xos harflar bilan)
-    elif re.search(r'[çğışöüÇĞİŞÖÜ]', text):
-        return 'tr'
-    # 5. Ingliz tili (Lotin)
-    elif re.search(r'[a-zA-Z]', text):
-        return 'en'
-    return 'en'
-
-def split_text_by_pattern(text):
-    pattern = r'(\([^()]+\)|[^()]+)'
-    parts = re.findall(pattern, text)
-    segments = []
-    for part in parts:
-        clean_part = part.strip()
-        if not clean_part: continue
-            
-        if clean_part.startswith("(") and clean_part.endswith(")"):
-            segments.append({'text': clean_part[1:-1].strip(), 'lang': 'uz'})
-        else:
-            lang = detect_language_by_chars(clean_part)
-            segments.append({'text': clean_part, 'lang': lang})
-    return segments
-
-# --- 2. START VA ADMIN FUNKSIYALARI ---
+# --- 1. START VA ADMIN FUNKSIYALARI ---
 
 @router.message(Command("start"))
 async def start_handler(message: types.Message):
     user = message.from_user
-    add_user(user.id, user.username, user.full_name)
+    await add_user(user.id, user.username, user.full_name)
     welcome = (f"Assalomu alaykum, <b>{user.full_name}</b>!\n"
                "Men 7 ta tilda professional audio yaratuvchi botman.\n"
                "Matn yoki fayl yuboring.\n\n"
@@ -82,8 +51,27 @@ async def admin_panel(message: types.Message):
 @router.message(F.text == "📊 Statistika")
 async def stats_view(message: types.Message):
     if message.from_user.id == ADMIN_ID:
-        t, d, u = get_stats()
-        await message.answer(f"📈 <b>Statistika:</b>\n\n👥 Foydalanuvchilar: {t}\n📅 Bugun: {d}\n🎙 Audiolar: {u}", parse_mode="HTML")
+        t, d, u = await get_stats()
+        rows, _ = await get_breakdown()
+        await message.answer(f"📈 <b>Statistika:</b>\n\n👥 Foydalanuvchilar: {t}\n📅 Bugun: {d}\n🎙 Audiolar: {u}\n\n{_format_breakdown(rows)}{format_cache_stats()}\n{format_scheduler_stats()}\n{format_resilience_stats()}", parse_mode="HTML")
+
+def _format_breakdown(rows):
+    """Bugungi ishlar: tillar, rejimlar va eng ko'p ishlatilgan ovozlar (kunlik agregatdan)."""
+    if not rows:
+        return ""
+    by = {"lang": {}, "mode": {}, "voice": {}}
+    chars = audio = 0
+    for lang, voice, mode, jobs, failures, text_chars, audio_bytes, duration in rows:
+        for field, value in (("lang", lang), ("mode", mode), ("voice", f"{lang}/{voice}")):
+            by[field][value] = by[field].get(value, 0) + jobs
+        chars += text_chars
+        audio += audio_bytes
+
+    def top(counts, n=5):
+        return ", ".join(f"{k} {v}" for k, v in sorted(counts.items(), key=lambda kv: -kv[1])[:n])
+
+    return (f"🌍 Tillar: {top(by['lang'])}\n⚙️ Rejimlar: {top(by['mode'])}\n🗣 Ovozlar: {top(by['voice'], 3)}\n"
+            f"📝 Matn: {chars // 1000}K belgi | 🎧 Audio: {audio // (1024 * 1024)} MB\n\n")
 
 @router.message(F.text == "📢 Xabar yuborish")
 async def broadcast_request(message: types.Message, state: FSMContext):
@@ -93,45 +81,52 @@ async def broadcast_request(message: types.Message, state: FSMContext):
 
 @router.message(BotStates.waiting_for_broadcast)
 async def perform_broadcast(message: types.Message, state: FSMContext, bot: Bot):
-    users = get_all_users()
-    count = 0
-    status_msg = await message.answer(f"⏳ Yuborilmoqda: 0/{len(users)}")
-    for u_id in users:
-        try:
-            await bot.copy_message(chat_id=u_id, from_chat_id=message.chat.id, message_id=message.message_id)
-            count += 1
-            if count % 10 == 0: await status_msg.edit_text(f"⏳ Yuborilmoqda: {count}/{len(users)}")
-            await asyncio.sleep(0.05)
-        except: pass
-    await message.answer(f"✅ Tugadi. {count} ta foydalanuvchiga yetkazildi.")
+    # Yuborish fonda davom etadi; holat bazada saqlanadi va qayta ishga tushganda tiklanadi
+    await start_broadcast(bot, message.chat.id, message.message_id, message.chat.id)
     await state.clear()
 
-# --- 3. MATNNI QABUL QILISH ---
+# --- 2. MATNNI QABUL QILISH ---
 
 @router.message(F.content_type.in_({'text', 'document'}))
 async def content_handler(message: types.Message, state: FSMContext, bot: Bot):
     if message.text in ["🔐 Admin Panel", "📊 Statistika", "📢 Xabar yuborish", "🔙 Bosh menyu"]: return
     
     msg = await message.answer(f"⏳ Tahlil qilinmoqda...\n{get_p_bar(20)}", parse_mode="HTML")
+    prog = progress.track(msg)
     text = ""
+    stats = {}
     if message.document:
         file = await bot.get_file(message.document.file_id)
         with tempfile.NamedTemporaryFile(delete=False) as tmp:
-            await bot.download_file(file.file_path, tmp.name)
-            ext = message.document.file_name.split('.')[-1].lower()
-            if ext == 'pdf': text = read_pdf(tmp.name)
-            elif ext == 'docx': text = read_docx(tmp.name)
-            elif ext == 'txt': text = read_txt(tmp.name)
+            with metrics.stage("download"):
+                await bot.download_file(file.file_path, tmp.name)
+        ext = (message.document.file_name or "").split('.')[-1].lower()
+        pages = []
+        try:
+            # Tahlil alohida jarayonda; sahifalar tayyor bo'lishi bilan kelib, progress yangilanadi
+            with metrics.stage("extract"):
+                async for page in iter_document(tmp.name, ext, stats):
+                    pages.append(page)
+                    if stats.get("total_pages"):
+                        planned = min(stats["total_pages"], EXTRACT_MAX_PAGES)
+                        prog.update(f"📄 O'qilmoqda: {stats['pages']}/{planned} sahifa\n"
+                                    f"{get_p_bar(20 + stats['pages'] * 70 // planned)}")
+        except ExtractionError as e:
+            await prog.final(f"❌ Faylni o'qib bo'lmadi: {e}", parse_mode=None)
+            return
+        finally:
             os.remove(tmp.name)
+        text = "".join(pages)
     else: text = message.text
 
     if not text:
-        await msg.edit_text("❌ Matn bo'sh.")
+        await prog.final("❌ Matn bo'sh.")
         return
 
-    await msg.edit_text(f"✅ Tayyor!\n{get_p_bar(100)}", parse_mode="HTML")
-    
+    # Oraliq "Tayyor" tahriri yo'q: u chiqib ketsa, yakuniy klaviatura PROGRESS_MIN_INTERVAL kutib qoladi
     instr_text = (
+        (f"✂️ <b>Matn juda uzun</b> - faqat boshidagi {stats['chars']} belgi "
+         f"({stats['pages']} sahifa/bo'lak) olindi.\n\n" if stats.get("truncated") else "") +
         "🌍 <b>Tilni yoki Mix Rejimni tanlang:</b>\n\n"
         "💡 <b>Mix rejim qoidasi:</b>\n"
         "Qavs ichidagi <code>(...)</code> gaplar har doim <b>o'zbekcha</b> o'qiladi. "
@@ -140,10 +135,14 @@ async def content_handler(message: types.Message, state: FSMContext, bot: Bot):
         "<i>Annyeong! (Salom!) Merhaba! (Qalay!)</i>"
     )
     
-    await msg.edit_text(instr_text, parse_mode="HTML", reply_markup=lang_inline_kb())
-    await state.update_data(text=text)
+    try:
+        await state.update_data(text=text)
+    except StorageQuotaExceeded:
+        await prog.final("❌ Matn juda katta. Qisqaroq matn yoki fayl yuboring.")
+        return
+    await prog.final(instr_text, reply_markup=lang_inline_kb())
 
-# --- 4. AUDIO GENERATSIYA VA IMZO ---
+# --- 3. AUDIO GENERATSIYA VA IMZO ---
 
 @router.callback_query(F.data.startswith("lang_"))
 async def lang_choice(call: types.CallbackQuery, state: FSMContext):
@@ -151,6 +150,34 @@ async def lang_choice(call: types.CallbackQuery, state: FSMContext):
     await state.update_data(lang=lang)
     await call.message.edit_text("🗣 Ovoz turini tanlang:", reply_markup=voices_inline_kb(lang))
 
+async def render_audio(prog, original_text, lang_code, voice_key, audio):
+    """Tarjima va sintez - scheduler worker'ida bajariladi, natija audio buferiga yoziladi."""
+    if lang_code == "multi":
+        # Bir xil ovozdagi qo'shni gaplar bitta TTS so'roviga birlashtiriladi
+        plan = segment_text(original_text, voice_key)
+        jobs = [(seg['text'], seg['voice']) for seg in plan]
+        prog.update(f"🌐 Ko'p tilli tahlil: {len(jobs)} ta TTS so'rovi...\n{get_p_bar(10)}")
+
+        async def on_progress(done, total):
+            percent = 10 + int(done / total * 80)
+            prog.update(f"🎙 Audio yozilmoqda ({done}/{total})...\n{get_p_bar(percent)}")
+
+        # Kadrlar darajasida birlashtirish: ortiqcha sarlavhalarsiz, umumiy davomiylik bilan
+        segments = await synthesize_segments(jobs, on_progress)
+        try:
+            with metrics.stage("concat"):
+                concat_mp3([seg.source() for seg in segments], audio)
+        finally:
+            for seg in segments:
+                seg.close()
+    else:
+        prog.update(f"🌍 Tarjima...\n{get_p_bar(40)}")
+        final_text = await translate_text(original_text, lang_code)
+        v_id = VOICES[lang_code]['voices'][voice_key]['id']
+        # Boshqa yo'llar kabi TTS_CONCURRENCY slotini egallaydi
+        async with tts_semaphore:
+            await generate_audio(final_text, v_id, audio)
+
 @router.callback_query(F.data.startswith("voice_"))
 async def voice_choice(call: types.CallbackQuery, state: FSMContext, bot: Bot):
     parts = call.data.split("_", 2)
@@ -158,52 +185,135 @@ async def voice_choice(call: types.CallbackQuery, state: FSMContext, bot: Bot):
     
     data = await state.get_data()
     original_text = data.get("text", "")
-    output_final = f"audio_{call.from_user.id}.mp3"
+    audio = AudioBuffer()
+    prog = progress.track(call.message)
+    replaced = False
+    failed = False
+    done = False
+    out_bytes = 0
+    started = time.perf_counter()
+    if lang_code == "multi":
+        mode = "mix"
+    elif len(original_text) > AUDIOBOOK_MIN_CHARS:
+        mode = "audiobook"
+    else:
+        mode = "translate"
+
+    async def on_position(pos):
+        prog.update(f"⏳ Navbatdasiz: <b>{pos}</b>-o'rin\n{get_p_bar(5)}")
+
+    voice_name = VOICES[lang_code if lang_code!='multi' else 'uz']['voices'][voice_key]['name']
+    rejim_label = "Ko'p tilli (Smart Mix)" if lang_code == "multi" else f"Tarjima ({lang_code})"
+    caption = (f"✅ <b>Audio Tayyor!</b>\n\n"
+               f"🎙 Ovoz: {voice_name}\n"
+               f"🤖 <b>Bot:</b> @TTSpro_robot\n"
+               f"⚙️ Rejim: {rejim_label}")
+
+    # Kesh kaliti: Mix rejimda ovozlar segmentga qarab tanlanadi, shuning uchun voice_key ishlatiladi
+    cache_voice = f"multi:{voice_key}" if lang_code == "multi" else VOICES[lang_code]['voices'][voice_key]['id']
+    cache_key = make_cache_key(original_text, cache_voice, TTS_RATE)
     
     try:
-        if lang_code == "multi":
-            segments = split_text_by_pattern(original_text)
-            temp_files = []
-            await call.message.edit_text(f"🌐 Ko'p tilli tahlil...\n{get_p_bar(10)}", parse_mode="HTML")
-            
-            for i, seg in enumerate(segments):
-                tmp_name = f"chunk_{i}_{call.from_user.id}.mp3"
-                target_lang = seg['lang'] if seg['lang'] in VOICES else 'uz'
-                v_id = VOICES[target_lang]['voices'][voice_key]['id']
-                await generate_audio(seg['text'], v_id, tmp_name)
-                temp_files.append(tmp_name)
-                prog = 10 + int((i+1)/len(segments) * 80)
-                await call.message.edit_text(f"🎙 Audio yozilmoqda ({i+1}/{len(segments)})...\n{get_p_bar(prog)}", parse_mode="HTML")
-
-            with open(output_final, "wb") as outfile:
-                for f in temp_files:
-                    with open(f, "rb") as infile: outfile.write(infile.read())
-                    os.remove(f)
-            rejim_label = "Ko'p tilli (Smart Mix)"
-        else:
-            await call.message.edit_text(f"🌍 Tarjima...\n{get_p_bar(40)}", parse_mode="HTML")
-            final_text = await translate_text(original_text, lang_code)
+        # 0. Uzun matn - audiokitob: qismlar tayyor bo'lishi bilan yuboriladi
+        if mode == "audiobook":
             v_id = VOICES[lang_code]['voices'][voice_key]['id']
-            await generate_audio(final_text, v_id, output_final)
-            rejim_label = f"Tarjima ({lang_code})"
+            job = await scheduler.submit(
+                call.from_user.id,
+                lambda: run_audiobook(bot, prog, call.from_user.id, original_text, lang_code, v_id, caption),
+                on_position,
+                lane="book",
+            )
+            sent, total, cancelled, out_bytes = await job.future
+            if cancelled:
+                await call.message.answer(f"⏹ To'xtatildi: {sent}/{total} qism yuborildi.")
+            done = sent > 0
+            return
 
-        await call.message.edit_text(f"📤 Yuklanmoqda...\n{get_p_bar(95)}", parse_mode="HTML")
-        
-        voice_name = VOICES[lang_code if lang_code!='multi' else 'uz']['voices'][voice_key]['name']
-        caption = (f"✅ <b>Audio Tayyor!</b>\n\n"
-                   f"🎙 Ovoz: {voice_name}\n"
-                   f"🤖 <b>Bot:</b> @TTSpro_robot\n"
-                   f"⚙️ Rejim: {rejim_label}")
-        
-        await bot.send_audio(call.message.chat.id, FSInputFile(output_final), caption=caption, parse_mode="HTML")
-        update_stats()
+        # 1. file_id bo'yicha qayta yuborish (sintez ham, yuklash ham yo'q)
+        file_id = await audio_cache.get_file_id(cache_key)
+        if file_id:
+            try:
+                with metrics.stage("upload"):
+                    await bot.send_audio(call.message.chat.id, file_id, caption=caption, parse_mode="HTML")
+                done = True
+                return
+            except TelegramBadRequest:
+                await audio_cache.forget_file_id(cache_key)
+
+        # 2. Diskdagi MP3 keshi, bo'lmasa - umumiy navbat orqali sintez
+        cached_path = audio_cache.get_path(cache_key)
+        if cached_path is None:
+            job = await scheduler.submit(
+                call.from_user.id,
+                lambda: render_audio(prog, original_text, lang_code, voice_key, audio),
+                on_position,
+            )
+            await job.future
+
+            await audio_cache.put_buffer(cache_key, audio)
+            input_file = audio.as_input_file("audio.mp3")
+            out_bytes = audio.size
+        else:
+            # Fayl yuklash paytida bo'lak-bo'lak o'qiladi - xotiraga to'liq olinmaydi
+            input_file = FSInputFile(cached_path, filename="audio.mp3")
+            out_bytes = os.path.getsize(cached_path)
+
+        prog.update(f"📤 Yuklanmoqda...\n{get_p_bar(95)}")
         
+        with metrics.stage("upload"):
+            sent = await bot.send_audio(call.message.chat.id, input_file, caption=caption, parse_mode="HTML")
+        if sent.audio:
+            await audio_cache.set_file_id(cache_key, sent.audio.file_id)
+        done = True
+
+    except JobCancelled:
+        # Foydalanuvchi boshqa ovozni tanladi - xabar va holat endi yangi ishga tegishli
+        replaced = True
+    except UserBusy:
+        # Oldingi ish shu xabardan progress ko'rsatmoqda - xabarga ham, holatga ham tegilmaydi
+        replaced = True
+        await call.answer("⏳ Oldingi audio hali tayyorlanmoqda, kuting.", show_alert=True)
+    except QueueFull:
+        failed = True
+        await call.message.answer("⏳ Server hozir band. Birozdan so'ng qayta urinib ko'ring.")
     except Exception as e:
+        failed = True
         await call.message.answer(f"❌ Xatolik: {str(e)}")
     finally:
-        if os.path.exists(output_final): os.remove(output_final)
-        await call.message.delete()
-        await state.clear()
+        audio.close()
+        prog.close()
+        if not replaced:
+            elapsed = time.perf_counter() - started
+            metrics.observe("job", elapsed, error=failed)
+            if done or failed:
+                record_job(call.from_user.id, lang_code, voice_key, mode, len(original_text), out_bytes, elapsed, ok=done)
+            try:
+                await call.message.delete()
+            except TelegramBadRequest:
+                pass
+            await state.clear()
+
+@router.callback_query(F.data == "book_cancel")
+async def book_cancel(call: types.CallbackQuery):
+    if await cancel_audiobook(call.from_user.id):
+        await call.answer("⏹ To'xtatilmoqda...")
+    else:
+        await call.answer("Faol audiokitob yo'q.")
+
+@router.callback_query(F.data.startswith("test_"))
+async def voice_test(call: types.CallbackQuery, bot: Bot):
+    # Namunalar oldindan tayyorlangan - sintez yo'q, faqat file_id orqali yuboriladi
+    lang = call.data.split("_", 1)[1]
+    try:
+        ready = await send_previews(bot, call.message.chat.id, lang)
+    except TelegramBadRequest:
+        await invalidate_previews(bot, lang)
+        ready = False
+    if ready:
+        await call.answer()
+    else:
+        retry_previews(bot)
+        await call.answer("⏳ Namunalar tayyorlanmoqda, birozdan so'ng qayta urinib ko'ring.", show_alert=True)
 
 @router.callback_query(F.data == "back_to_lang")
 async def back_to_lang(call: types.CallbackQuery):
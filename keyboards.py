@@ -1,17 +1,19 @@
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton
 from config import ADMIN_ID, VOICES
 
-def main_menu(user_id):
+# Klaviaturalar o'zgarmaydi - import paytida bir marta quriladi (pastda), har chaqiruvda emas
+
+def _build_main_menu(is_admin):
     """Asosiy menyu tugmalari"""
     kb = [
         [KeyboardButton(text="📝 Matn yuborish"), KeyboardButton(text="ℹ️ Yordam")],
         [KeyboardButton(text="📞 Bog'lanish")]
     ]
-    if user_id == ADMIN_ID:
+    if is_admin:
         kb.append([KeyboardButton(text="🔐 Admin Panel")])
     return ReplyKeyboardMarkup(keyboard=kb, resize_keyboard=True)
 
-def admin_menu():
+def _build_admin_menu():
     """Admin boshqaruv paneli tugmalari"""
     kb = [
         [KeyboardButton(text="📊 Statistika"), KeyboardButton(text="📢 Xabar yuborish")],
@@ -19,7 +21,7 @@ def admin_menu():
     ]
     return ReplyKeyboardMarkup(keyboard=kb, resize_keyboard=True)
 
-def lang_inline_kb():
+def _build_lang_kb():
     """Tillar va rejimlarni tanlash menyusi"""
     kb = []
     
@@ -45,7 +47,11 @@ def lang_inline_kb():
         
     return InlineKeyboardMarkup(inline_keyboard=kb)
 
-def voices_inline_kb(lang_code):
+def _build_audiobook_cancel_kb():
+    """Audiokitob jarayonini to'xtatish tugmasi"""
+    return InlineKeyboardMarkup(inline_keyboard=[[InlineKeyboardButton(text="⏹ To'xtatish", callback_data="book_cancel")]])
+
+def _build_voices_kb(lang_code):
     """Tanlangan til uchun ovoz modellarini ko'rsatish"""
     kb = []
     
@@ -67,3 +73,28 @@ def voices_inline_kb(lang_code):
     kb.append([InlineKeyboardButton(text="🔙 Ortga", callback_data="back_to_lang")])
     
     return InlineKeyboardMarkup(inline_keyboard=kb)
+
+# --- Tayyor klaviaturalar ---
+
+_MAIN_MENU = _build_main_menu(False)
+_MAIN_MENU_ADMIN = _build_main_menu(True)
+_ADMIN_MENU = _build_admin_menu()
+_LANG_KB = _build_lang_kb()
+_AUDIOBOOK_CANCEL_KB = _build_audiobook_cancel_kb()
+_VOICES_KB = {code: _build_voices_kb(code) for code in VOICES}
+
+def main_menu(user_id):
+    return _MAIN_MENU_ADMIN if user_id == ADMIN_ID else _MAIN_MENU
+
+def admin_menu():
+    return _ADMIN_MENU
+
+def lang_inline_kb():
+    return _LANG_KB
+
+def audiobook_cancel_kb():
+    return _AUDIOBOOK_CANCEL_KB
+
+def voices_inline_kb(lang_code):
+    kb = _VOICES_KB.get(lang_code)
+    return kb if kb is not None else _build_voices_kb(lang_code)
@@ -1,42 +1,85 @@
 import asyncio
 import logging
+import sqlite3
 import sys
 import threading
+import time
 import streamlit as st
-from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
 
 # Loyihangizdagi boshqa fayllardan import qilish
-from config import BOT_TOKEN
-from database import init_db
-from handlers import router
-
-# 1. Botni ishga tushirishning asosiy funksiyasi
-async def start_bot():
-    # Ma'lumotlar bazasini yaratish/tekshirish
-    init_db()
-    
-    # Bot va Dispatcher sozlamalari
-    bot = Bot(token=BOT_TOKEN)
-    dp = Dispatcher(storage=MemoryStorage())
-    
-    # Routerni ulash
-    dp.include_router(router)
-    
-    # Eskirgan xabarlarni o'chirib yuborish (Webhookni tozalash)
-    await bot.delete_webhook(drop_pending_updates=True)
-    
-    # DIQQAT: handle_signals=False Streamlit Cloud-dagi RuntimeError-ni oldini oladi
-    await dp.start_polling(bot, handle_signals=False)
+from config import DASHBOARD_RUN_BOT
+from database import get_stats_sync, get_breakdown_sync
+from scheduler import scheduler
+from metrics import metrics
 
-# 2. Botni alohida oqimda (Thread) yurgizish funksiyasi
+# 1-2. Bot endi bot.py da; dashboard uni faqat DASHBOARD_RUN_BOT=1 bo'lsa shu jarayonda yurgizadi
 def run_bot_in_thread():
+    from bot import run_polling
     # Yangi thread uchun yangi asyncio event loop yaratamiz
     loop = asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
-    loop.run_until_complete(start_bot())
+    # DIQQAT: handle_signals=False Streamlit Cloud-dagi RuntimeError-ni oldini oladi
+    loop.run_until_complete(run_polling(handle_signals=False))
+
+# 3. Bosqichlar bo'yicha metrikalar (bot oqimi bilan umumiy registry)
+def _fmt_seconds(value):
+    return "-" if value is None else f"{value:.2f}"
+
+def render_db_stats():
+    try:
+        total_users, today_usage, total_usage = get_stats_sync()
+    except sqlite3.OperationalError:
+        st.warning("Baza hali yaratilmagan.")
+        return
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Foydalanuvchilar", total_users)
+    col2.metric("Bugun", today_usage)
+    col3.metric("Jami audiolar", total_usage)
 
-# 3. Streamlit Web Interfeysi
+    # Agregat jadvallardan: o'qish narxi tarix hajmiga bog'liq emas
+    rows, hourly = get_breakdown_sync()
+    if hourly:
+        st.caption("Oxirgi 24 soat: ishlar soni")
+        st.bar_chart([{"Soat": hour[-5:], "Ishlar": jobs} for hour, jobs, _, _ in hourly], x="Soat", y="Ishlar")
+    if rows:
+        st.caption("Bugun: til / ovoz / rejim kesimida")
+        st.table([{
+            "Til": lang, "Ovoz": voice, "Rejim": mode, "Ishlar": jobs, "Xatolar": failures,
+            "Belgilar": text_chars, "Audio (MB)": round(audio_bytes / 1024 / 1024, 1),
+            "O'rtacha (s)": round(duration / jobs, 1) if jobs else 0,
+        } for lang, voice, mode, jobs, failures, text_chars, audio_bytes, duration
+            in sorted(rows, key=lambda r: -r[3])])
+
+def render_metrics():
+    snap = metrics.snapshot()
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Ishlar / daqiqa", metrics.jobs_per_minute())
+    col2.metric("Navbatda", scheduler.depth)
+    col3.metric("Band worker'lar", f"{scheduler.busy}/{scheduler.workers}")
+
+    rows = [{
+        "Bosqich": name,
+        "Soni": s["count"],
+        "Xatolar": s["errors"],
+        "Jarayonda": s["in_flight"],
+        "p50 (s)": _fmt_seconds(s["p50"]),
+        "p95 (s)": _fmt_seconds(s["p95"]),
+        "p99 (s)": _fmt_seconds(s["p99"]),
+    } for name, s in sorted(snap.items())]
+    if rows:
+        st.table(rows)
+    else:
+        st.info("Hali o'lchovlar yo'q.")
+
+    # Provayder chaqiruvlari: qayta urinish va hedge ulushi
+    counters = [{"Provayder": group, **values} for group, values in sorted(metrics.counters.items())]
+    if counters:
+        st.table(counters)
+
+    with st.expander("Prometheus formatida eksport"):
+        st.code(metrics.render_prometheus(), language="text")
+
+# 4. Streamlit Web Interfeysi
 if __name__ == "__main__":
     # Loglarni sozlash (Xatolarni terminalda ko'rish uchun)
     logging.basicConfig(level=logging.INFO, stream=sys.stdout)
@@ -50,14 +93,33 @@ if __name__ == "__main__":
     """)
 
     # Bot faqat bir marta ishga tushishini ta'minlash (st.session_state orqali)
-    if 'bot_thread_started' not in st.session_state:
+    if not DASHBOARD_RUN_BOT:
+        st.info("Monitor rejimi: bot alohida jarayonda ishlaydi (`python bot.py`), "
+                "bu sahifa faqat bazadagi ko'rsatkichlarni o'qiydi.")
+    elif 'bot_thread_started' not in st.session_state:
         # Alohida thread yaratish
         thread = threading.Thread(target=run_bot_in_thread, daemon=True)
         thread.start()
         st.session_state['bot_thread_started'] = True
         st.success("Telegram Bot fon rejimida muvaffaqiyatli ishga tushdi!")
 
-    # Statistika vidjeti uchun joy (ixtiyoriy)
     st.divider()
     if st.button("🔄 Serverni yangilash"):
         st.rerun() # Oldingi experimental_rerun o'rniga yangi rerun ishlatildi
+
+    st.subheader("📈 Statistika")
+    render_db_stats()
+
+    # Jonli metrikalar (har 2 soniyada yangilanadi) - faqat bot shu jarayonda bo'lsa;
+    # alohida worker'lar o'z metrikalarini /metrics manzilida beradi
+    if DASHBOARD_RUN_BOT:
+        st.subheader("📊 Bosqichlar bo'yicha kechikish")
+        if hasattr(st, "fragment"):
+            st.fragment(run_every=2)(render_metrics)()
+        else:
+            # Eski Streamlit versiyalari: skript oxirida yangilanish sikli
+            placeholder = st.empty()
+            while True:
+                with placeholder.container():
+                    render_metrics()
+                time.sleep(2)
@@ -0,0 +1,136 @@
+import time
+from collections import deque
+
+from config import METRICS_WINDOW
+
+# Prometheus gistogrammasi chegaralari (soniya)
+_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, float("inf"))
+
+class StageMetrics:
+    """Bitta bosqich: kechikish gistogrammasi, oxirgi namunalar, xatolar va bajarilayotganlar soni."""
+
+    __slots__ = ("samples", "buckets", "count", "errors", "in_flight", "total_seconds")
+
+    def __init__(self, window):
+        self.samples = deque(maxlen=window)
+        self.buckets = [0] * len(_BUCKETS)
+        self.count = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.total_seconds = 0.0
+
+    def observe(self, seconds, error):
+        self.samples.append(seconds)
+        for i, bound in enumerate(_BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+        self.count += 1
+        self.total_seconds += seconds
+        if error:
+            self.errors += 1
+
+class _Timer:
+    __slots__ = ("stage", "started")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.stage.in_flight += 1
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stage.in_flight -= 1
+        self.stage.observe(time.perf_counter() - self.started, exc_type is not None)
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+class MetricsRegistry:
+    """
+    Jarayon ichidagi metrikalar. Faqat bot event loop oqimi yozadi, Streamlit oqimi esa
+    o'qiydi - shuning uchun qulf ishlatilmaydi (deque.append va list(deque) GIL ostida atomar).
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.stages = {}
+        self.jobs = deque(maxlen=window)
+        self.counters = {}  # guruh -> {hodisa: son} (masalan, resilience.py siyosatlari)
+
+    def _stage(self, name):
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = StageMetrics(self.window)
+        return stage
+
+    def stage(self, name):
+        """`with metrics.stage("tts"):` yoki `async with ...` - vaqt, xato va in-flight hisobi."""
+        return _Timer(self._stage(name))
+
+    def observe(self, name, seconds, error=False):
+        self._stage(name).observe(seconds, error)
+
+    def register_counters(self, group, counters):
+        """Tashqi modul o'z hisoblagichlari lug'atini eksportga qo'shadi (nusxa emas - jonli)."""
+        self.counters[group] = counters
+
+    def job_done(self):
+        self.jobs.append(time.time())
+
+    def jobs_per_minute(self):
+        cutoff = time.time() - 60
+        return sum(1 for t in list(self.jobs) if t >= cutoff)
+
+    def snapshot(self):
+        result = {}
+        for name, stage in list(self.stages.items()):
+            samples = sorted(stage.samples)
+            result[name] = {
+                "count": stage.count,
+                "errors": stage.errors,
+                "in_flight": stage.in_flight,
+                "p50": _percentile(samples, 0.50),
+                "p95": _percentile(samples, 0.95),
+                "p99": _percentile(samples, 0.99),
+            }
+        return result
+
+    def render_prometheus(self):
+        """Prometheus text formatidagi eksport: har bir oila o'z TYPE qatoridan keyin yaxlit keladi."""
+        stages = sorted(self.stages.items())
+        lines = ["# TYPE audioai_stage_seconds histogram"]
+        for name, stage in stages:
+            cumulative = 0
+            for bound, n in zip(_BUCKETS, list(stage.buckets)):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f'audioai_stage_seconds_bucket{{stage="{name}",le="{le}"}} {cumulative}')
+            lines.append(f'audioai_stage_seconds_sum{{stage="{name}"}} {stage.total_seconds:.6f}')
+            lines.append(f'audioai_stage_seconds_count{{stage="{name}"}} {stage.count}')
+        lines.append("# TYPE audioai_stage_errors_total counter")
+        for name, stage in stages:
+            lines.append(f'audioai_stage_errors_total{{stage="{name}"}} {stage.errors}')
+        lines.append("# TYPE audioai_stage_in_flight gauge")
+        for name, stage in stages:
+            lines.append(f'audioai_stage_in_flight{{stage="{name}"}} {stage.in_flight}')
+        lines.append("# TYPE audioai_events_total counter")
+        for group, counters in sorted(self.counters.items()):
+            for event, value in sorted(counters.items()):
+                lines.append(f'audioai_events_total{{group="{group}",event="{event}"}} {value}')
+        lines.append("# TYPE audioai_jobs_per_minute gauge")
+        lines.append(f"audioai_jobs_per_minute {self.jobs_per_minute()}")
+        return "\n".join(lines) + "\n"
+
+def _percentile(samples, q):
+    if not samples:
+        return None
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+metrics = MetricsRegistry(METRICS_WINDOW)
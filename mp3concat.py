@@ -0,0 +1,153 @@
+import mmap
+import os
+import struct
+
+# --- MPEG audio (Layer III) sarlavhasi ---
+
+_BITRATES = {
+    1: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),   # MPEG-1
+    2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),       # MPEG-2 / 2.5
+}
+_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+def _parse_header(b0, b1, b2, b3):
+    """4 baytli kadr sarlavhasi -> (kadr uzunligi, side info uzunligi) yoki None."""
+    if b0 != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+    version = (b1 >> 3) & 3
+    layer = (b1 >> 1) & 3
+    bitrate_idx = b2 >> 4
+    sr_idx = (b2 >> 2) & 3
+    if version == 1 or layer != 1 or bitrate_idx in (0, 15) or sr_idx == 3:
+        return None
+    mpeg1 = version == 3
+    bitrate = _BITRATES[1 if mpeg1 else 2][bitrate_idx] * 1000
+    sample_rate = _SAMPLE_RATES[version][sr_idx]
+    padding = (b2 >> 1) & 1
+    length = (144 if mpeg1 else 72) * bitrate // sample_rate + padding
+    mono = (b3 >> 6) == 3
+    side_info = (17 if mono else 32) if mpeg1 else (9 if mono else 17)
+    if not b1 & 1:
+        side_info += 2  # CRC
+    return length, side_info
+
+def _id3v2_size(view):
+    if len(view) >= 10 and bytes(view[:3]) == b"ID3":
+        size = (view[6] << 21) | (view[7] << 14) | (view[8] << 7) | view[9]
+        footer = 10 if view[5] & 0x10 else 0
+        return 10 + size + footer
+    return 0
+
+def _scan(view):
+    """
+    Kadrlar chegarasini topish: boshidagi ID3v2, oxiridagi ID3v1 va Xing/Info kadri tashlab yuboriladi.
+    Natija: (boshlanish, tugash, kadrlar soni, birinchi audio kadr sarlavhasi, bitreytlar to'plami).
+    """
+    end = len(view)
+    if end >= 128 and bytes(view[end - 128:end - 125]) == b"TAG":
+        end -= 128
+    pos = _id3v2_size(view)
+    start, frames, first, bitrates = None, 0, None, set()
+    while pos + 4 <= end:
+        parsed = _parse_header(view[pos], view[pos + 1], view[pos + 2], view[pos + 3])
+        if parsed is None:
+            if start is None:
+                pos += 1  # sarlavhadan oldingi axlat - sinxronni qidirish
+                continue
+            break
+        length, side_info = parsed
+        if pos + length > end:
+            break
+        tag = bytes(view[pos + 4 + side_info:pos + 8 + side_info])
+        if start is None and tag in (b"Xing", b"Info"):
+            pos += length
+            continue
+        if start is None:
+            start, first = pos, bytes(view[pos:pos + 4])
+        frames += 1
+        bitrates.add(view[pos + 2] >> 4)
+        pos += length
+    if start is None:
+        return 0, 0, 0, None, bitrates
+    return start, pos, frames, first, bitrates
+
+def _info_frame(first, total_frames, audio_bytes, vbr):
+    """Umumiy kadrlar soni va hajmi yozilgan Xing/Info kadri (pleyerlar davomiylik va seek uchun)."""
+    b1 = first[1] | 0x01           # CRC yo'q
+    b2 = first[2] & ~0x02 & 0xFF   # padding yo'q
+    b3 = first[3]
+    needed = 4 + 32 + 12
+    for bitrate_idx in range(b2 >> 4, 15):
+        hdr = (0xFF, b1, (b2 & 0x0F) | (bitrate_idx << 4), b3)
+        length, side_info = _parse_header(*hdr)
+        if length >= needed:
+            break
+    frame = bytearray(length)
+    frame[:4] = bytes(hdr)
+    offset = 4 + side_info
+    frame[offset:offset + 4] = b"Xing" if vbr else b"Info"
+    # Kadrlar soni - faqat audio kadrlar (Info kadrining o'zi kirmaydi), baytlar - butun oqim
+    frame[offset + 4:offset + 16] = struct.pack(">III", 0x03, total_frames, audio_bytes + length)
+    return bytes(frame)
+
+def _output_fd(out):
+    """Chiqish haqiqiy fayl bo'lsa - uning deskriptori (sendfile uchun), aks holda None."""
+    try:
+        return out.fileno()
+    except (AttributeError, OSError):
+        return None
+
+def concat_mp3(sources, out):
+    """
+    MP3 bo'laklarini kadrlar darajasida birlashtirish.
+    sources: bytes/memoryview yoki fayl yo'llari; fayllar mmap orqali o'qiladi, shuning uchun
+    xotira sarfi chiqish hajmiga bog'liq emas. out: write() metodi bor obyekt (AudioBuffer, fayl);
+    manbalarda fayl bo'lsa va out.fileno() bersa - fayldan faylga sendfile bilan ko'chiriladi.
+    """
+    views, closers = [], []
+    try:
+        for src in sources:
+            if isinstance(src, (str, os.PathLike)):
+                f = open(src, "rb")
+                closers.append(f)
+                if os.fstat(f.fileno()).st_size == 0:
+                    views.append((src, memoryview(b"")))
+                    continue
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                closers.append(mm)
+                views.append((src, memoryview(mm)))
+            else:
+                views.append((src, memoryview(src)))
+
+        spans = [_scan(view) for _, view in views]
+        total_frames = sum(s[2] for s in spans)
+        first = next((s[3] for s in spans if s[3]), None)
+        if first is None:
+            # MP3 kadrlari topilmadi - o'zgarishsiz ulash
+            for _, view in views:
+                out.write(view)
+            return
+
+        audio_bytes = sum(s[1] - s[0] for s in spans)
+        bitrates = set().union(*(s[4] for s in spans))
+        out.write(_info_frame(first, total_frames, audio_bytes, vbr=len(bitrates) > 1))
+
+        has_files = any(isinstance(src, (str, os.PathLike)) for src, _ in views)
+        out_fd = _output_fd(out) if has_files else None
+        for (src, view), (start, end, frames, _, _) in zip(views, spans):
+            if not frames:
+                continue
+            if out_fd is not None and isinstance(src, (str, os.PathLike)):
+                # Fayldan faylga: ma'lumot yadro ichida ko'chiriladi
+                out.flush()
+                with open(src, "rb") as f:
+                    offset = start
+                    while offset < end:
+                        offset += os.sendfile(out_fd, f.fileno(), offset, end - offset)
+            else:
+                out.write(view[start:end])
+    finally:
+        for _, view in views:
+            view.release()
+        for c in reversed(closers):
+            c.close()
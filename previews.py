@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import time
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import InputMediaAudio
+
+from config import VOICES, TTS_RATE, PREVIEW_CHAT_ID, PREVIEW_RETRY_BASE, PREVIEW_RETRY_MAX
+from utils import synthesize_segments
+from audio_cache import make_cache_key
+from database import get_voice_previews, save_voice_preview, delete_voice_previews
+
+# Til -> [(ovoz kaliti, file_id), ...]; faqat to'liq tayyor tillar saqlanadi
+_bank = {}
+_refresh_task = None
+_failures = 0
+_retry_at = 0.0  # shu vaqtgacha (monotonic) SINOV bosilishi yangi urinishni boshlamaydi
+
+def _preview_plan():
+    """Har bir ovoz uchun namuna: (til, ovoz kaliti, dayjest, matn, ovoz id, sarlavha)."""
+    plan = []
+    for lang, info in VOICES.items():
+        # Mix rejimda o'zbekcha ovozlar ishlatiladi - namuna matni ham o'zbekcha
+        text = info.get("test_text") or VOICES["uz"]["test_text"]
+        for voice_key, voice in info["voices"].items():
+            digest = make_cache_key(text, voice["id"], TTS_RATE)
+            plan.append((lang, voice_key, digest, text, voice["id"], voice["name"]))
+    return plan
+
+async def ensure_previews(bot):
+    """
+    Startup'da fonda: faqat yangi yoki o'zgargan ovozlar sintez qilinadi va saqlash chatiga
+    bir marta yuklanadi. Bir xil (matn, ovoz) juftligi (masalan, multi va uz) qayta ishlatiladi.
+    """
+    plan = _preview_plan()
+    stored = {(lang, key): (digest, file_id) for lang, key, digest, file_id in await get_voice_previews()}
+    by_digest = {digest: file_id for digest, file_id in stored.values()}
+
+    missing = {}
+    for lang, voice_key, digest, text, voice_id, title in plan:
+        if stored.get((lang, voice_key), (None,))[0] == digest:
+            continue
+        if digest in by_digest:
+            await save_voice_preview(lang, voice_key, digest, by_digest[digest])
+            continue
+        missing.setdefault(digest, (text, voice_id, title))
+
+    # Endi VOICES'da yo'q ovozlar
+    current = {(lang, voice_key) for lang, voice_key, *_ in plan}
+    stale = [k for k in stored if k not in current]
+    if stale:
+        await delete_voice_previews(stale)
+
+    if missing:
+        logging.info("Ovoz namunalari sintez qilinmoqda: %d ta", len(missing))
+        digests = list(missing)
+        segments = await synthesize_segments([missing[d][:2] for d in digests])
+        try:
+            for digest, audio in zip(digests, segments):
+                title = missing[digest][2]
+                msg = await bot.send_audio(PREVIEW_CHAT_ID, audio.as_input_file(f"{title}.mp3"),
+                                           title=title, performer="AudioAI", disable_notification=True)
+                by_digest[digest] = msg.audio.file_id
+                # Darhol saqlanadi: keyingi yuklash xato bersa ham tayyorlari yo'qolmaydi
+                for lang, voice_key, d, *_ in plan:
+                    if d == digest:
+                        await save_voice_preview(lang, voice_key, digest, msg.audio.file_id)
+                # file_id xabar o'chirilgandan keyin ham amal qiladi - saqlash chati toza qoladi
+                try:
+                    await msg.delete()
+                except TelegramBadRequest:
+                    pass
+        finally:
+            for audio in segments:
+                audio.close()
+
+    await load_previews()
+
+async def load_previews():
+    _bank.clear()
+    order = {(lang, key): i for i, (lang, key, *_) in enumerate(_preview_plan())}
+    rows = sorted(await get_voice_previews(), key=lambda r: order.get((r[0], r[1]), len(order)))
+    for lang, voice_key, _, file_id in rows:
+        if (lang, voice_key) in order:
+            _bank.setdefault(lang, []).append((voice_key, file_id))
+
+def start_refresh(bot):
+    """ensure_previews ni fonda ishga tushirish (allaqachon ketayotgan bo'lsa - qayta emas)."""
+    global _refresh_task
+    if _refresh_task is None or _refresh_task.done():
+        _refresh_task = asyncio.create_task(ensure_previews(bot))
+        _refresh_task.add_done_callback(_on_done)
+    return _refresh_task
+
+def retry_refresh(bot):
+    """
+    Namunalar tayyor emas (SINOV bosildi): fon yangilash ishlamayotgan va oldingi xatodan keyingi
+    kutish o'tgan bo'lsa - qayta ishga tushirish. Aks holda bitta muvaffaqiyatsiz urinish
+    (edge-tts uzilishi, PREVIEW_CHAT_ID ga yozib bo'lmasligi) bot qayta ishga tushguncha qolardi.
+    """
+    if _refresh_task is not None and not _refresh_task.done():
+        return
+    if time.monotonic() < _retry_at:
+        return
+    start_refresh(bot)
+
+def _on_done(task):
+    global _failures, _retry_at
+    if task.cancelled():
+        return
+    if task.exception() is not None:
+        _failures += 1
+        delay = min(PREVIEW_RETRY_MAX, PREVIEW_RETRY_BASE * 2 ** (_failures - 1))
+        _retry_at = time.monotonic() + delay
+        logging.error("Ovoz namunalarini tayyorlab bo'lmadi (%.0f s dan keyin qayta): %s", delay, task.exception())
+    else:
+        _failures = 0
+        _retry_at = 0.0
+
+async def send_previews(bot, chat_id, lang):
+    """Til ovozlari namunalarini file_id orqali yuborish. Tayyor bo'lmasa - False."""
+    items = _bank.get(lang)
+    if items is None:
+        # Boshqa worker tayyorlagan bo'lishi mumkin
+        await load_previews()
+        items = _bank.get(lang)
+    if not items or len(items) < len(VOICES.get(lang, {}).get("voices", {})):
+        return False
+
+    voices = VOICES[lang]["voices"]
+    captions = [f"{'👩‍💼' if voices[k].get('gender') == 'Ayol' else '👨‍💼'} {voices[k]['name']}" for k, _ in items]
+    if len(items) == 1:
+        await bot.send_audio(chat_id, items[0][1], caption=captions[0])
+    else:
+        await bot.send_media_group(chat_id, [
+            InputMediaAudio(media=file_id, caption=caption)
+            for (_, file_id), caption in zip(items, captions)
+        ])
+    return True
+
+async def invalidate(bot, lang):
+    """Telegram file_id ni rad etdi - shu til namunalarini qayta tayyorlash."""
+    bad = {file_id for _, file_id in _bank.get(lang, [])}
+    rows = await get_voice_previews()
+    # Bir xil file_id bir nechta tilda ishlatilgan bo'lishi mumkin (multi va uz)
+    await delete_voice_previews([(l, k) for l, k, _, file_id in rows if l == lang or file_id in bad])
+    _bank.clear()
+    start_refresh(bot)
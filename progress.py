@@ -0,0 +1,99 @@
+import asyncio
+import logging
+import time
+
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+
+from config import PROGRESS_MIN_INTERVAL
+
+def get_p_bar(percent):
+    filled = int(percent / 10)
+    bar = "▓" * filled + "░" * (10 - filled)
+    return f"<code>{bar}</code> {percent}%"
+
+class ProgressReporter:
+    """
+    Barcha handler'lar uchun umumiy xabar tahrirlash xizmati.
+    Har bir chat uchun ko'pi bilan `min_interval` soniyada bitta tahrir;
+    oraliq holatlar tashlab yuboriladi, o'zgarmagan matn qayta yuborilmaydi.
+    """
+
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self._next_allowed = {}  # chat_id -> keyingi tahrir mumkin bo'lgan vaqt
+        self.edits = 0
+        self.dropped = 0
+
+    def track(self, message):
+        return Progress(self, message)
+
+    def _reserve(self, chat_id):
+        """Chat uchun navbatdagi tahrir vaqtini band qilish; kutish kerak bo'lgan soniyani qaytaradi."""
+        now = time.monotonic()
+        slot = max(now, self._next_allowed.get(chat_id, 0.0))
+        self._next_allowed[chat_id] = slot + self.min_interval
+        if len(self._next_allowed) > 10_000:
+            self._next_allowed = {c: t for c, t in self._next_allowed.items() if t > now}
+        return slot - now
+
+    def _postpone(self, chat_id, seconds):
+        self._next_allowed[chat_id] = max(self._next_allowed.get(chat_id, 0.0), time.monotonic() + seconds)
+
+class Progress:
+    """Bitta xabar uchun holat: faqat eng so'nggi matn saqlanadi va fonda yuboriladi."""
+
+    def __init__(self, reporter, message):
+        self.reporter = reporter
+        self.message = message
+        self._pending = None   # (matn, kwargs)
+        self._shown = None
+        self._task = None
+        self._closed = False
+
+    def update(self, text, **kwargs):
+        """Bloklamaydi: yangi holatni yozib qo'yadi, tahrir fonda bajariladi."""
+        if self._closed:
+            return
+        if self._pending is not None:
+            self.reporter.dropped += 1
+        self._pending = (text, {"parse_mode": "HTML", **kwargs})
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def final(self, text, **kwargs):
+        """Yakuniy holat - tashlab yuborilmaydi, tahrir tugaguncha kutiladi."""
+        self._pending = (text, {"parse_mode": "HTML", **kwargs})
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush_loop())
+        await asyncio.shield(self._task)
+
+    def close(self):
+        """Xabar o'chirilgan yoki endi kerak emas - kutilayotgan tahrirlarni bekor qilish."""
+        self._closed = True
+        self._pending = None
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _flush_loop(self):
+        chat_id = self.message.chat.id
+        while self._pending is not None:
+            delay = self.reporter._reserve(chat_id)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            state, self._pending = self._pending, None
+            if state is None or state == self._shown:
+                continue
+            text, kwargs = state
+            try:
+                await self.message.edit_text(text, **kwargs)
+                self._shown = state
+                self.reporter.edits += 1
+            except TelegramRetryAfter as e:
+                self.reporter._postpone(chat_id, e.retry_after)
+                if self._pending is None:
+                    self._pending = state
+            except TelegramBadRequest as e:
+                # "message is not modified" yoki xabar o'chirilgan
+                logging.debug("Progress tahriri o'tkazib yuborildi: %s", e)
+
+progress = ProgressReporter(PROGRESS_MIN_INTERVAL)
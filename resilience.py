@@ -0,0 +1,199 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+
+from config import (TTS_ATTEMPT_TIMEOUT, TTS_RETRIES, TRANSLATE_ATTEMPT_TIMEOUT, TRANSLATE_RETRIES,
+                    RETRY_BACKOFF, RETRY_BACKOFF_MAX, HEDGE_MIN_DELAY, HEDGE_MAX_RATIO,
+                    BREAKER_THRESHOLD, BREAKER_RESET, TTS_CONCURRENCY)
+from metrics import metrics
+
+class CircuitOpen(Exception):
+    pass
+
+class CircuitBreaker:
+    """
+    Ketma-ket `threshold` ta xatodan so'ng `reset_timeout` soniya davomida chaqiruvlar darhol rad etiladi.
+    Keyin bitta sinov chaqiruviga ruxsat beriladi: muvaffaqiyatli bo'lsa - yopiladi, aks holda yana ochiladi.
+    """
+
+    def __init__(self, threshold, reset_timeout):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self):
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def release(self):
+        """Sinov chaqiruvi natijasiz tugadi (bekor qilindi) - keyingi chaqiruv yana sinab ko'radi."""
+        self._probing = False
+
+    def success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.opened_at is not None or self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+class ProviderPolicy:
+    """
+    Tashqi provayder chaqiruvi: har urinishga muddat, tasodifiy (jitter) eksponensial kutish bilan
+    qayta urinish, sekin urinishga p95 dan keyin parallel "hedge" nusxa va circuit breaker.
+
+    size - so'rov hajmi (belgilar); muddat va hedge kechikishi (1 + size/1000) ga proporsional.
+    Hedge'lar umumiy chaqiruvlarning `hedge_ratio` ulushidan oshmaydi - provayder ortiqcha yuklanmaydi.
+    hedge_limiter - umumiy semafor: hedge o'z slotini oladi, bo'sh slot bo'lmasa hedge qilinmaydi
+    (chaqiruvchi asosiy urinish uchun slotni o'zi egallagan bo'ladi).
+    """
+
+    def __init__(self, name, timeout, retries, breaker, hedge_min_delay=HEDGE_MIN_DELAY,
+                 hedge_ratio=HEDGE_MAX_RATIO, backoff=RETRY_BACKOFF, backoff_max=RETRY_BACKOFF_MAX,
+                 hedge_limiter=None):
+        self.name = name
+        self.timeout = timeout
+        self.retries = retries
+        self.breaker = breaker
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_ratio = hedge_ratio
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.hedge_limiter = hedge_limiter
+        self._samples = deque(maxlen=256)  # muvaffaqiyatli urinishlar: soniya / hajm birligi
+        self.stats = {"calls": 0, "attempts": 0, "retries": 0, "timeouts": 0, "failures": 0,
+                      "hedges": 0, "hedge_wins": 0, "hedge_skipped": 0, "rejected": 0}
+        metrics.register_counters(name, self.stats)
+
+    def _hedge_delay(self, scale):
+        if len(self._samples) < 20 or self.stats["hedges"] >= self.hedge_ratio * self.stats["calls"]:
+            return None
+        samples = sorted(self._samples)
+        return max(self.hedge_min_delay, samples[int(0.95 * (len(samples) - 1))] * scale)
+
+    async def _attempt(self, factory, timeout, scale):
+        self.stats["attempts"] += 1
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(factory(), timeout)
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            raise
+        self._samples.append((time.perf_counter() - started) / scale)
+        return result
+
+    async def _limited_attempt(self, factory, timeout, scale):
+        try:
+            return await self._attempt(factory, timeout, scale)
+        finally:
+            self.hedge_limiter.release()
+
+    async def _start_hedge(self, factory, timeout, scale):
+        if self.hedge_limiter is None:
+            return asyncio.create_task(self._attempt(factory, timeout, scale))
+        if self.hedge_limiter.locked():
+            return None
+        # Bo'sh slot bor - acquire() kutmasdan qaytadi
+        await self.hedge_limiter.acquire()
+        return asyncio.create_task(self._limited_attempt(factory, timeout, scale))
+
+    async def _hedged(self, factory, timeout, scale):
+        first = asyncio.create_task(self._attempt(factory, timeout, scale))
+        pending = {first}
+        try:
+            delay = self._hedge_delay(scale)
+            if delay is not None:
+                done, _ = await asyncio.wait(pending, timeout=delay)
+                if not done:
+                    hedge = await self._start_hedge(factory, timeout, scale)
+                    if hedge is None:
+                        self.stats["hedge_skipped"] += 1
+                    else:
+                        self.stats["hedges"] += 1
+                        pending.add(hedge)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not first:
+                            self.stats["hedge_wins"] += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # Yutqazgan urinish bekor qilinadi
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def call(self, factory, size=0):
+        """factory() har chaqirilganda yangi urinish (coroutine/future) qaytarishi kerak."""
+        probe = self.breaker.state == "half_open"
+        if not self.breaker.allow():
+            self.stats["rejected"] += 1
+            raise CircuitOpen(f"{self.name} xizmati vaqtincha ishlamayapti, birozdan so'ng urinib ko'ring")
+        self.stats["calls"] += 1
+        scale = 1 + size / 1000
+        timeout = self.timeout * scale
+        try:
+            for attempt in range(self.retries + 1):
+                if attempt:
+                    self.stats["retries"] += 1
+                    await asyncio.sleep(random.uniform(0, min(self.backoff_max, self.backoff * 2 ** attempt)))
+                try:
+                    result = await self._hedged(factory, timeout, scale)
+                except Exception as e:
+                    self.stats["failures"] += 1
+                    self.breaker.failure()
+                    if attempt == self.retries or self.breaker.state == "open":
+                        raise
+                    logging.warning("%s: qayta urinish (%d/%d): %r", self.name, attempt + 1, self.retries, e)
+                    continue
+                self.breaker.success()
+                return result
+        except BaseException:
+            # CancelledError Exception emas: bekor qilingan sinov chaqiruvi breaker'ni half_open'da
+            # qotirib qo'ymasligi kerak (masalan, Mix rejimda gather qo'shni segmentlarni bekor qiladi)
+            if probe:
+                self.breaker.release()
+            raise
+
+# Barcha foydalanuvchilar uchun umumiy edge-tts cheklovi; hedge urinishlari ham shu slotlardan oladi
+tts_semaphore = asyncio.Semaphore(TTS_CONCURRENCY)
+
+tts_policy = ProviderPolicy("tts", TTS_ATTEMPT_TIMEOUT, TTS_RETRIES,
+                            CircuitBreaker(BREAKER_THRESHOLD, BREAKER_RESET), hedge_limiter=tts_semaphore)
+# Tarjima hedge'lari translate_pool navbatida turadi - bir vaqtdagi so'rovlar pool hajmidan oshmaydi
+translate_policy = ProviderPolicy("translate", TRANSLATE_ATTEMPT_TIMEOUT, TRANSLATE_RETRIES,
+                                  CircuitBreaker(BREAKER_THRESHOLD, BREAKER_RESET))
+
+def format_resilience_stats():
+    lines = []
+    for policy in (tts_policy, translate_policy):
+        s = policy.stats
+        calls = s["calls"] or 1
+        lines.append(f"🛡 {policy.name}: {policy.breaker.state} | 🔁 retry {s['retries'] * 100 // calls}% "
+                     f"| 🪞 hedge {s['hedges'] * 100 // calls}% (yutuq {s['hedge_wins']}) "
+                     f"| ⏱ {s['timeouts']} | 🚫 {s['rejected']}")
+    return "\n".join(lines)
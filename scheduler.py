@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import time
+from collections import deque, defaultdict
+
+from config import SCHEDULER_WORKERS, SCHEDULER_MAX_PENDING, SCHEDULER_PER_USER_INFLIGHT, SCHEDULER_BOOK_WORKERS
+
+class QueueFull(Exception):
+    """Navbat to'lgan - foydalanuvchiga keyinroq urinib ko'rish aytiladi."""
+
+class JobCancelled(Exception):
+    """Foydalanuvchi yangi so'rov yubordi va eski kutayotgan ish bekor qilindi."""
+
+class UserBusy(Exception):
+    """Foydalanuvchining oldingi ishi hali bajarilmoqda - yangisi qabul qilinmaydi."""
+
+class Job:
+    def __init__(self, user_id, factory, on_position, lane=None):
+        self.user_id = user_id
+        self.factory = factory
+        self.on_position = on_position
+        self.lane = lane
+        self.future = asyncio.get_running_loop().create_future()
+        self.last_position = None
+
+class TTSScheduler:
+    """
+    TTS va tarjima ishlari uchun umumiy navbat:
+    - cheklangan navbat va belgilangan sondagi worker'lar;
+    - foydalanuvchilar o'rtasida navbatma-navbat (round-robin) adolat;
+    - har bir foydalanuvchi uchun bir vaqtda bajariladigan ishlar chegarasi;
+    - yangi so'rov kelsa, o'sha foydalanuvchining kutayotgan eski ishi bekor qilinadi;
+    - ishi bajarilayotgan foydalanuvchining yangi so'rovi rad etiladi (ikki marta bosish);
+    - uzoq ishlar (lane) uchun bir vaqtda band qilinadigan worker'lar chegarasi (lane_limits).
+    """
+
+    def __init__(self, workers, max_pending, per_user_inflight, lane_limits=None):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.per_user_inflight = per_user_inflight
+        self.lane_limits = lane_limits or {}
+        self.busy = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self._pending = {}             # user_id -> deque[Job]
+        self._order = deque()          # navbatda ishi bor foydalanuvchilar (round-robin tartibi)
+        self._inflight = defaultdict(int)
+        self._lanes = defaultdict(int)  # lane -> bajarilayotgan ishlar
+        self._cond = asyncio.Condition()
+        self._tasks = []
+        self._busy_seconds = 0.0
+        self._started_at = None
+
+    @property
+    def depth(self):
+        return sum(len(q) for q in self._pending.values())
+
+    def start(self):
+        if self._tasks:
+            return
+        self._started_at = time.monotonic()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+
+    async def stop(self):
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, user_id, factory, on_position=None, lane=None):
+        """
+        Ishni navbatga qo'yish. factory - argumentsiz korutina funksiyasi.
+        lane - lane_limits dagi kalit (masalan, "book"). Natijani job.future orqali kutish mumkin.
+        """
+        # Boshlangan ishni to'xtatib bo'lmaydi - ikkinchi nusxa ikkinchi audio bo'lib qolardi
+        if self._inflight.get(user_id, 0) >= self.per_user_inflight:
+            raise UserBusy()
+
+        old = self._pending.pop(user_id, None)
+        if old:
+            self._order.remove(user_id)
+            for job in old:
+                if not job.future.done():
+                    job.future.set_exception(JobCancelled())
+                self.cancelled += 1
+
+        if self.depth >= self.max_pending:
+            raise QueueFull()
+
+        job = Job(user_id, factory, on_position, lane)
+        self._pending[user_id] = deque([job])
+        self._order.append(user_id)
+        async with self._cond:
+            self._cond.notify_all()
+        self._notify_positions()
+        return job
+
+    def _next_job(self):
+        for _ in range(len(self._order)):
+            user_id = self._order[0]
+            self._order.rotate(-1)
+            if self._inflight.get(user_id, 0) >= self.per_user_inflight:
+                continue
+            queue = self._pending[user_id]
+            lane = queue[0].lane
+            if lane in self.lane_limits and self._lanes[lane] >= self.lane_limits[lane]:
+                continue
+            job = queue.popleft()
+            if not queue:
+                del self._pending[user_id]
+                self._order.remove(user_id)
+            return job
+        return None
+
+    def positions(self):
+        """Round-robin tartibini simulyatsiya qilib, har bir kutayotgan ishning o'rnini hisoblash."""
+        result = {}
+        queues = [self._pending[u] for u in self._order]
+        pos, r = 0, 0
+        while True:
+            progressed = False
+            for q in queues:
+                if r < len(q):
+                    pos += 1
+                    result[q[r]] = pos
+                    progressed = True
+            if not progressed:
+                return result
+            r += 1
+
+    def _notify_positions(self):
+        loop = asyncio.get_running_loop()
+        for job, pos in self.positions().items():
+            if job.on_position and pos != job.last_position:
+                job.last_position = pos
+                loop.create_task(self._safe_position(job, pos))
+
+    @staticmethod
+    async def _safe_position(job, pos):
+        try:
+            await job.on_position(pos)
+        except Exception as e:
+            logging.debug("Navbat o'rnini yangilab bo'lmadi: %s", e)
+
+    async def _worker(self, index):
+        while True:
+            async with self._cond:
+                job = self._next_job()
+                while job is None:
+                    await self._cond.wait()
+                    job = self._next_job()
+
+            self.busy += 1
+            self._inflight[job.user_id] += 1
+            self._lanes[job.lane] += 1
+            self._notify_positions()
+            started = time.monotonic()
+            try:
+                result = await job.factory()
+                if not job.future.done():
+                    job.future.set_result(result)
+                self.completed += 1
+            except asyncio.CancelledError:
+                if not job.future.done():
+                    job.future.set_exception(JobCancelled())
+                raise
+            except Exception as e:
+                self.failed += 1
+                if not job.future.done():
+                    job.future.set_exception(e)
+            finally:
+                self._busy_seconds += time.monotonic() - started
+                self.busy -= 1
+                self._lanes[job.lane] -= 1
+                self._inflight[job.user_id] -= 1
+                if not self._inflight[job.user_id]:
+                    del self._inflight[job.user_id]
+                async with self._cond:
+                    self._cond.notify_all()
+
+    def snapshot(self):
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0
+        capacity = elapsed * self.workers
+        return {
+            "depth": self.depth,
+            "max_pending": self.max_pending,
+            "busy": self.busy,
+            "workers": self.workers,
+            "utilization": self._busy_seconds / capacity if capacity else 0.0,
+            "completed": self.completed,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+        }
+
+scheduler = TTSScheduler(SCHEDULER_WORKERS, SCHEDULER_MAX_PENDING, SCHEDULER_PER_USER_INFLIGHT,
+                         lane_limits={"book": SCHEDULER_BOOK_WORKERS})
+
+def format_scheduler_stats():
+    s = scheduler.snapshot()
+    return (f"🧵 Navbat: {s['depth']}/{s['max_pending']} | Band: {s['busy']}/{s['workers']} "
+            f"| Yuklama: {int(s['utilization'] * 100)}%\n"
+            f"   ✅ {s['completed']} | ❌ {s['failed']} | ⏹ {s['cancelled']}")
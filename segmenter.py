@@ -0,0 +1,85 @@
+import re
+
+from config import VOICES
+
+# --- 1. Yozuvni bir o'tishda aniqlash ---
+# Har bir belgi str.translate orqali bitta sinf harfiga aylantiriladi (qolganlari o'chiriladi),
+# so'ng natijada qaysi sinflar borligi tekshiriladi. Ustuvorlik: ko > ar > ru > tr > en.
+
+_SCRIPT_RANGES = (
+    ('k', [(0xAC00, 0xD7AF)]),                                   # Koreys (Hangul)
+    ('a', [(0x0600, 0x06FF)]),                                   # Arab
+    ('r', [(ord('а'), ord('я')), (ord('А'), ord('Я')), (ord('ё'), ord('ё')), (ord('Ё'), ord('Ё'))]),
+    ('t', [(ord(c), ord(c)) for c in "çğışöüÇĞİŞÖÜ"]),          # Turkcha harflar
+    ('e', [(ord('a'), ord('z')), (ord('A'), ord('Z'))]),         # Lotin
+)
+_PRIORITY = (('k', 'ko'), ('a', 'ar'), ('r', 'ru'), ('t', 'tr'), ('e', 'en'))
+
+def _build_table():
+    size = max(hi for _, ranges in _SCRIPT_RANGES for _, hi in ranges) + 1
+    table = [None] * size
+    # Teskari tartibda: bir belgi ikki sinfga tushsa, ustuvorrog'i yoziladi
+    for code, ranges in reversed(_SCRIPT_RANGES):
+        for lo, hi in ranges:
+            for cp in range(lo, hi + 1):
+                table[cp] = code
+    return table
+
+# Jadvaldan tashqaridagi belgilar (IndexError) o'zgarmay qoladi - ular sinf harflari bilan aralashmaydi
+_SCRIPT_TABLE = _build_table()
+
+def detect_language(text):
+    """Matndagi yozuvlarga qarab tilni aniqlash (bitta translate o'tishi)."""
+    codes = text.translate(_SCRIPT_TABLE)
+    for code, lang in _PRIORITY:
+        if code in codes:
+            return lang
+    return 'en'
+
+# --- 2. Segmentlash ---
+
+_PARTS_RE = re.compile(r'(\([^()]+\)|[^()]+)')
+# Gap chegarasi - tinish belgisidan keyingi bo'shliq yoki yangi qator ("3.14", "example.com" bo'linmaydi)
+_SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?…])\s+|\s*\n\s*')
+
+def split_text_by_pattern(text):
+    """
+    Qavs ichidagilar - o'zbekcha; tashqaridagi matn gaplarga bo'linib,
+    har bir gap uchun til alohida aniqlanadi.
+    """
+    segments = []
+    for part in _PARTS_RE.findall(text):
+        clean_part = part.strip()
+        if not clean_part:
+            continue
+        if clean_part.startswith("(") and clean_part.endswith(")"):
+            inner = clean_part[1:-1].strip()
+            if inner:
+                segments.append({'text': inner, 'lang': 'uz'})
+            continue
+        for sentence in _SENTENCE_SPLIT_RE.split(clean_part):
+            sentence = sentence.strip()
+            if sentence:
+                segments.append({'text': sentence, 'lang': detect_language(sentence)})
+    return segments
+
+def voice_for(lang, voice_key):
+    target_lang = lang if lang in VOICES else 'uz'
+    return VOICES[target_lang]['voices'][voice_key]['id']
+
+def segment_text(text, voice_key):
+    """
+    Mix rejim uchun sintez rejasi: bir xil ovozga tushadigan qo'shni segmentlar
+    bitta so'rovga birlashtiriladi. Natija: [{'text', 'lang', 'voice'}, ...];
+    ro'yxat uzunligi - TTS chaqiruvlari soni.
+    """
+    merged = []
+    for seg in split_text_by_pattern(text):
+        voice = voice_for(seg['lang'], voice_key)
+        if merged and merged[-1]['voice'] == voice:
+            merged[-1]['parts'].append(seg['text'])
+        else:
+            merged.append({'parts': [seg['text']], 'lang': seg['lang'], 'voice': voice})
+    for seg in merged:
+        seg['text'] = " ".join(seg.pop('parts'))
+    return merged
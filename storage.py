@@ -0,0 +1,152 @@
+import asyncio
+import json
+import logging
+import time
+import zlib
+from collections import OrderedDict
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage
+
+from config import FSM_TTL, FSM_PURGE_INTERVAL, FSM_MAX_BYTES_PER_USER, FSM_CACHE_BYTES
+from database import load_fsm, save_fsm_state, save_fsm_data, purge_fsm
+
+class StorageQuotaExceeded(Exception):
+    pass
+
+# Shundan kichik JSON siqilmaydi; kattasi esa event loop'ni bloklamaslik uchun oqimda siqiladi
+_COMPRESS_MIN = 512
+_OFFLOAD_MIN = 64 * 1024
+
+def _encode(data):
+    raw = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if len(raw) < _COMPRESS_MIN:
+        return b"j" + raw
+    return b"z" + zlib.compress(raw, 6)
+
+def _decode(blob):
+    if not blob:
+        return {}
+    blob = bytes(blob)
+    raw = zlib.decompress(blob[1:]) if blob[:1] == b"z" else blob[1:]
+    return json.loads(raw)
+
+def _weight(data):
+    """Xotiradagi taxminiy hajm: matn qiymatlari uzunligi + yozuvning doimiy qo'shimchasi."""
+    return 256 + sum(len(v) for v in data.values() if isinstance(v, str))
+
+async def _run(fn, blob_or_data, size):
+    if size >= _OFFLOAD_MIN:
+        return await asyncio.to_thread(fn, blob_or_data)
+    return fn(blob_or_data)
+
+class SQLiteStorage(BaseStorage):
+    """
+    FSM holatlari SQLite'da: data siqilgan JSON sifatida, TTL bilan va har bir foydalanuvchi
+    uchun hajm chegarasi bilan saqlanadi. Faol holatlar xotiradagi kichik LRU'da turadi
+    (hajmi baytlarda cheklangan), shuning uchun RAM foydalanuvchilar soniga bog'liq emas.
+    """
+
+    def __init__(self, ttl=FSM_TTL, max_user_bytes=FSM_MAX_BYTES_PER_USER, cache_bytes=FSM_CACHE_BYTES):
+        self.ttl = ttl
+        self.max_user_bytes = max_user_bytes
+        self.cache_bytes = cache_bytes
+        self._cache = OrderedDict()  # kalit -> [state, data, og'irlik, vaqt] (eng eskisi boshida)
+        self._cache_size = 0
+
+    @staticmethod
+    def _key(key):
+        return ":".join(str(part) for part in (
+            key.bot_id, key.chat_id, key.user_id, key.thread_id,
+            getattr(key, "business_connection_id", None), key.destiny,
+        ))
+
+    # --- LRU ---
+
+    def _cached(self, k):
+        entry = self._cache.get(k)
+        if entry is None:
+            return None
+        if entry[3] < time.time() - self.ttl:
+            self._evict(k)
+            return None
+        self._cache.move_to_end(k)
+        return entry
+
+    def _remember(self, k, state, data):
+        if not self.cache_bytes:
+            return
+        self._evict(k)
+        size = _weight(data)
+        if size > self.cache_bytes // 4:
+            return  # juda katta holat keshni siqib chiqarmasin
+        self._cache[k] = [state, data, size, time.time()]
+        self._cache_size += size
+        while self._cache_size > self.cache_bytes:
+            _, old = self._cache.popitem(last=False)
+            self._cache_size -= old[2]
+
+    def _evict(self, k):
+        old = self._cache.pop(k, None)
+        if old is not None:
+            self._cache_size -= old[2]
+
+    async def _load(self, k):
+        entry = self._cached(k)
+        if entry is not None:
+            return entry
+        row = await load_fsm(k, time.time() - self.ttl)
+        if row is None:
+            return [None, {}, 0, time.time()]
+        state, blob = row
+        size = len(blob) if blob else 0
+        data = await _run(_decode, blob, size)
+        self._remember(k, state, data)
+        return [state, data, 0, time.time()]
+
+    # --- BaseStorage ---
+
+    async def set_state(self, key, state=None):
+        k = self._key(key)
+        state = state.state if isinstance(state, State) else state
+        await save_fsm_state(k, key.user_id, state, time.time())
+        entry = self._cached(k)
+        if entry is not None:
+            entry[0] = state
+            entry[3] = time.time()
+
+    async def get_state(self, key):
+        return (await self._load(self._key(key)))[0]
+
+    async def set_data(self, key, data):
+        k = self._key(key)
+        data = dict(data)
+        blob = await _run(_encode, data, _weight(data)) if data else None
+        if not await save_fsm_data(k, key.user_id, blob, time.time(), self.max_user_bytes):
+            raise StorageQuotaExceeded(f"{len(blob)} bayt: foydalanuvchi chegarasidan oshdi")
+        entry = self._cached(k)
+        if entry is not None:
+            self._remember(k, entry[0], data)
+
+    async def get_data(self, key):
+        return dict((await self._load(self._key(key)))[1])
+
+    async def close(self):
+        self._cache.clear()
+        self._cache_size = 0
+
+    # --- Tozalash ---
+
+    async def purge_expired(self):
+        deleted = await purge_fsm(time.time() - self.ttl)
+        if deleted:
+            logging.info("Eskirgan FSM holatlari o'chirildi: %d", deleted)
+        return deleted
+
+    async def purger(self, interval=FSM_PURGE_INTERVAL):
+        while True:
+            try:
+                await self.purge_expired()
+            except Exception as e:
+                logging.error("FSM tozalashda xato: %s", e)
+            await asyncio.sleep(interval)
@@ -0,0 +1,22 @@
+from audiobook import split_into_parts
+
+def _text(sentences, word="so'z"):
+    return " ".join(f"{' '.join([word] * 9)} {i}." for i in range(sentences))
+
+def test_first_part_is_small_and_cut_at_sentence():
+    text = _text(600)
+    parts = split_into_parts(text, limit=15_000, first_limit=1_500)
+    assert len(parts[0]) <= 1_500
+    assert parts[0].endswith(".")
+    assert all(len(part) <= 15_000 for part in parts)
+    # Matn yo'qolmaydi va takrorlanmaydi
+    assert " ".join(parts).split() == text.split()
+
+def test_short_text_stays_single_part():
+    assert split_into_parts("Qisqa matn.", limit=15_000, first_limit=1_500) == ["Qisqa matn."]
+
+def test_chapters_start_new_parts():
+    text = "1-bob\n" + _text(20) + "\n2-bob\n" + _text(20)
+    parts = split_into_parts(text, limit=15_000, first_limit=100_000)
+    assert len(parts) == 2
+    assert parts[0].startswith("1-bob") and parts[1].startswith("2-bob")
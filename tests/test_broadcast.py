@@ -0,0 +1,43 @@
+import asyncio
+
+from aiogram.exceptions import ClientDecodeError, TelegramNotFound, TelegramServerError
+
+import broadcast
+from broadcast import TokenBucket, _send_one
+
+class FakeBot:
+    """copy_message navbatdagi xatolarni ketma-ket ko'taradi, keyin muvaffaqiyatli qaytadi."""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    async def copy_message(self, chat_id, from_chat_id, message_id):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+
+def _send(bot, monkeypatch):
+    monkeypatch.setattr(broadcast, "BROADCAST_CHAT_INTERVAL", 0)
+    return asyncio.run(_send_one(bot, TokenBucket(1000, 1000), 1, 2, 3))
+
+def test_sent(monkeypatch):
+    bot = FakeBot()
+    assert _send(bot, monkeypatch) == "sent"
+    assert bot.calls == 1
+
+def test_server_error_is_retried(monkeypatch):
+    bot = FakeBot(TelegramServerError(None, "Internal Server Error"))
+    assert _send(bot, monkeypatch) == "sent"
+    assert bot.calls == 2
+
+def test_other_api_error_fails_without_retry(monkeypatch):
+    bot = FakeBot(TelegramNotFound(None, "Not Found"))
+    assert _send(bot, monkeypatch) == "failed"
+    assert bot.calls == 1
+
+def test_unexpected_error_does_not_escape(monkeypatch):
+    bot = FakeBot(ClientDecodeError("bad json", ValueError(), {}))
+    assert _send(bot, monkeypatch) == "failed"
+    bot = FakeBot(RuntimeError("boom"))
+    assert _send(bot, monkeypatch) == "failed"
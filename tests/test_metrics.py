@@ -0,0 +1,32 @@
+from metrics import MetricsRegistry
+
+def _families(text):
+    """Namuna qatorlari -> ularning oilasi (TYPE qatoridagi nom) ketma-ketligi."""
+    order, current = [], None
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            current = line.split()[2]
+            assert current not in order, f"{current} oilasi ikki marta e'lon qilingan"
+            order.append(current)
+            continue
+        name = line.split("{")[0].split()[0]
+        assert current is not None and name.startswith(current), f"{name} {current} oilasidan tashqarida"
+    return order
+
+def test_prometheus_families_are_grouped():
+    registry = MetricsRegistry(100)
+    for stage in ("tts", "db", "upload"):
+        with registry.stage(stage):
+            pass
+    registry.observe("tts", 3.0, error=True)
+    registry.register_counters("tts", {"calls": 2})
+    registry.job_done()
+
+    text = registry.render_prometheus()
+    assert _families(text) == ["audioai_stage_seconds", "audioai_stage_errors_total",
+                               "audioai_stage_in_flight", "audioai_events_total", "audioai_jobs_per_minute"]
+    assert 'audioai_stage_seconds_count{stage="tts"} 2' in text
+    assert 'audioai_stage_seconds_bucket{stage="tts",le="+Inf"} 2' in text
+    assert 'audioai_stage_errors_total{stage="tts"} 1' in text
+    assert 'audioai_events_total{group="tts",event="calls"} 2' in text
+    assert "audioai_jobs_per_minute 1" in text
@@ -0,0 +1,83 @@
+import struct
+
+from mp3concat import concat_mp3, _scan
+from utils import AudioBuffer
+
+# MPEG-1 Layer III, 44.1 kHz, stereo, CRC yo'q: 128 kbit/s -> 417 bayt, 160 kbit/s -> 522 bayt
+_HEADERS = {128: (b"\xff\xfb\x90\x00", 417), 160: (b"\xff\xfb\xa0\x00", 522)}
+
+def _frame(fill, bitrate=128):
+    header, length = _HEADERS[bitrate]
+    return header + bytes([fill]) * (length - 4)
+
+def _mp3(frames, fill=1, bitrate=128):
+    return b"".join(_frame(fill, bitrate) for _ in range(frames))
+
+def _info(data):
+    """Chiqishdagi birinchi (Info/Xing) kadr: (teg, kadrlar soni, baytlar soni)."""
+    offset = 4 + 32
+    tag = data[offset:offset + 4]
+    _, frames, size = struct.unpack(">III", data[offset + 4:offset + 16])
+    return tag, frames, size
+
+def _concat(sources):
+    out = AudioBuffer()
+    try:
+        concat_mp3(sources, out)
+        return out.source().tobytes(), out.size
+    finally:
+        out.close()
+
+def test_frames_are_joined_after_single_info_frame():
+    a, b = _mp3(3, fill=1), _mp3(2, fill=2)
+    data, size = _concat([a, b])
+    assert size == len(data)
+    tag, frames, total = _info(data)
+    assert tag == b"Info"
+    assert frames == 5
+    assert total == len(data)
+    assert data.endswith(a + b)
+    assert _scan(memoryview(data))[2] == 5
+
+def test_tags_and_old_info_frames_are_dropped():
+    id3v2 = b"ID3\x03\x00\x00\x00\x00\x00\x0a" + b"\x00" * 10
+    id3v1 = b"TAG" + b"\x00" * 125
+    old_info, _ = _concat([_mp3(4, fill=7)])
+    src = id3v2 + old_info[:-len(_mp3(4, fill=7))] + _mp3(2, fill=3) + id3v1
+    data, _ = _concat([src, _mp3(1, fill=4)])
+    assert _info(data)[1] == 3
+    assert data.endswith(_mp3(2, fill=3) + _mp3(1, fill=4))
+    assert b"TAG" not in data and b"ID3" not in data
+
+def test_mixed_bitrates_are_marked_vbr():
+    data, _ = _concat([_mp3(2, bitrate=128), _mp3(2, bitrate=160)])
+    assert _info(data)[0] == b"Xing"
+
+def test_without_frames_sources_are_copied_as_is():
+    data, _ = _concat([b"abc", b"def"])
+    assert data == b"abcdef"
+
+def test_file_sources_match_memory_sources(tmp_path):
+    parts = [_mp3(3, fill=1), _mp3(2, fill=2), _mp3(4, fill=3)]
+    paths = []
+    for i, part in enumerate(parts):
+        path = tmp_path / f"{i}.mp3"
+        path.write_bytes(part)
+        paths.append(str(path))
+    expected, _ = _concat(parts)
+
+    # AudioBuffer chiqishi: fayl manbalari sendfile bilan ko'chiriladi, hajm to'g'ri hisoblanadi
+    out = AudioBuffer()
+    try:
+        concat_mp3([paths[0], parts[1], paths[2]], out)
+        assert out.spilled
+        assert out.size == len(expected)
+        assert open(out.source(), "rb").read() == expected
+    finally:
+        out.close()
+
+    # Oddiy fayl chiqishi
+    target = tmp_path / "out.mp3"
+    with open(target, "wb") as f:
+        concat_mp3(paths, f)
+    assert target.read_bytes() == expected
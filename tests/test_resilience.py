@@ -0,0 +1,132 @@
+import asyncio
+
+import pytest
+
+from resilience import CircuitBreaker, CircuitOpen, ProviderPolicy
+
+def _policy(name, retries=0, reset=0.05, **kwargs):
+    return ProviderPolicy(name, timeout=1.0, retries=retries, breaker=CircuitBreaker(2, reset),
+                          backoff=0.0, backoff_max=0.0, **kwargs)
+
+def test_breaker_transitions():
+    breaker = CircuitBreaker(threshold=2, reset_timeout=0.05)
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.failure()
+    assert breaker.state == "closed"
+    breaker.failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    asyncio.run(asyncio.sleep(0.06))
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    # Sinov davomida boshqa chaqiruvlar rad etiladi
+    assert not breaker.allow()
+    breaker.failure()
+    assert breaker.state == "open"
+
+    asyncio.run(asyncio.sleep(0.06))
+    assert breaker.allow()
+    breaker.success()
+    assert breaker.state == "closed" and breaker.failures == 0 and breaker.allow()
+
+def test_retry_then_success():
+    async def main():
+        policy = _policy("test_retry", retries=2)
+        calls = 0
+
+        async def flaky():
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                raise ConnectionError("uzildi")
+            return "ok"
+
+        assert await policy.call(flaky) == "ok"
+        assert calls == 2
+        assert policy.stats["retries"] == 1
+        assert policy.breaker.state == "closed"
+    asyncio.run(main())
+
+def test_open_breaker_rejects_calls():
+    async def main():
+        policy = _policy("test_open", reset=10)
+
+        async def boom():
+            raise ConnectionError("uzildi")
+
+        for _ in range(2):
+            with pytest.raises(ConnectionError):
+                await policy.call(boom)
+        with pytest.raises(CircuitOpen):
+            await policy.call(boom)
+        assert policy.stats["rejected"] == 1
+    asyncio.run(main())
+
+def test_cancelled_probe_does_not_wedge_half_open():
+    async def main():
+        policy = _policy("test_cancel")
+        policy.breaker.failure()
+        policy.breaker.failure()
+        await asyncio.sleep(0.06)
+        assert policy.breaker.state == "half_open"
+
+        started = asyncio.Event()
+
+        async def slow():
+            started.set()
+            await asyncio.sleep(10)
+
+        probe = asyncio.create_task(policy.call(slow))
+        await started.wait()
+        # Sinov ketayotganda boshqa chaqiruv rad etiladi
+        with pytest.raises(CircuitOpen):
+            await policy.call(slow)
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+        # Keyingi chaqiruv yana sinov bo'la oladi va breaker'ni yopadi
+        assert policy.breaker.state == "half_open"
+        assert await policy.call(lambda: asyncio.sleep(0, "ok")) == "ok"
+        assert policy.breaker.state == "closed"
+    asyncio.run(main())
+
+def _warm(policy, seconds=0.001, count=20):
+    for _ in range(count):
+        policy._samples.append(seconds)
+    policy.stats["calls"] = count
+
+def test_hedge_takes_its_own_slot():
+    async def main():
+        slots = asyncio.Semaphore(2)
+        policy = _policy("test_hedge", hedge_limiter=slots)
+        policy.hedge_min_delay = 0.01
+        policy.hedge_ratio = 1.0
+        _warm(policy)
+        attempts = 0
+
+        async def first_is_slow():
+            nonlocal attempts
+            attempts += 1
+            await asyncio.sleep(1 if attempts == 1 else 0)
+            return attempts
+
+        async with slots:
+            assert await policy.call(first_is_slow) == 2
+            assert policy.stats["hedges"] == 1 and policy.stats["hedge_wins"] == 1
+        # Hedge slotni qaytardi - ikkala slot bo'sh
+        await asyncio.wait_for(asyncio.gather(slots.acquire(), slots.acquire()), 0.1)
+    asyncio.run(main())
+
+def test_hedge_skipped_without_free_slot():
+    async def main():
+        slots = asyncio.Semaphore(1)
+        policy = _policy("test_hedge_full", hedge_limiter=slots)
+        policy.hedge_min_delay = 0.01
+        policy.hedge_ratio = 1.0
+        _warm(policy)
+
+        async with slots:
+            assert await policy.call(lambda: asyncio.sleep(0.05, "slow")) == "slow"
+        assert policy.stats["hedges"] == 0 and policy.stats["hedge_skipped"] == 1
+    asyncio.run(main())
@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+
+from scheduler import TTSScheduler, QueueFull, JobCancelled, UserBusy
+
+async def _blocked_scheduler(workers=1, max_pending=10):
+    """Barcha worker'lar band: navbatdagi ishlar gate ochilguncha kutadi."""
+    sched = TTSScheduler(workers, max_pending, per_user_inflight=1)
+    sched.start()
+    gate = asyncio.Event()
+    blockers = []
+    for i in range(workers):
+        blockers.append(await sched.submit(-1 - i, gate.wait))
+    await asyncio.sleep(0)
+    assert sched.busy == workers
+    return sched, gate, blockers
+
+def test_jobs_run_round_robin_and_report_positions():
+    async def main():
+        sched, gate, _ = await _blocked_scheduler()
+        order, positions = [], {}
+
+        def make(user):
+            async def factory():
+                order.append(user)
+                return user
+            return factory
+
+        async def record(user, pos):
+            positions.setdefault(user, pos)
+
+        jobs = []
+        for user in (1, 2, 3):
+            jobs.append(await sched.submit(user, make(user), lambda pos, u=user: record(u, pos)))
+        assert [sched.positions()[job] for job in jobs] == [1, 2, 3]
+        await asyncio.sleep(0)
+        assert positions == {1: 1, 2: 2, 3: 3}
+
+        gate.set()
+        assert await asyncio.gather(*(job.future for job in jobs)) == [1, 2, 3]
+        assert order == [1, 2, 3]
+        await sched.stop()
+    asyncio.run(main())
+
+def test_new_request_cancels_pending_job():
+    async def main():
+        sched, gate, _ = await _blocked_scheduler()
+        old = await sched.submit(1, lambda: asyncio.sleep(0, "old"))
+        new = await sched.submit(1, lambda: asyncio.sleep(0, "new"))
+        with pytest.raises(JobCancelled):
+            await old.future
+        assert sched.depth == 1
+        gate.set()
+        assert await new.future == "new"
+        assert sched.snapshot()["cancelled"] == 1
+        await sched.stop()
+    asyncio.run(main())
+
+def test_resubmit_while_running_is_rejected():
+    async def main():
+        sched, gate, blockers = await _blocked_scheduler()
+        with pytest.raises(UserBusy):
+            await sched.submit(-1, lambda: asyncio.sleep(0))
+        gate.set()
+        await blockers[0].future
+        await asyncio.sleep(0)
+        job = await sched.submit(-1, lambda: asyncio.sleep(0, "ok"))
+        assert await job.future == "ok"
+        await sched.stop()
+    asyncio.run(main())
+
+def test_queue_full():
+    async def main():
+        sched, gate, _ = await _blocked_scheduler(max_pending=2)
+        await sched.submit(1, gate.wait)
+        await sched.submit(2, gate.wait)
+        with pytest.raises(QueueFull):
+            await sched.submit(3, gate.wait)
+        gate.set()
+        await sched.stop()
+    asyncio.run(main())
+
+def test_failed_job_propagates_error():
+    async def main():
+        sched = TTSScheduler(1, 10, per_user_inflight=1)
+        sched.start()
+
+        async def boom():
+            raise ValueError("xato")
+
+        job = await sched.submit(1, boom)
+        with pytest.raises(ValueError):
+            await job.future
+        assert sched.snapshot()["failed"] == 1
+        await sched.stop()
+    asyncio.run(main())
+
+def test_lane_limit_leaves_workers_for_short_jobs():
+    async def main():
+        sched = TTSScheduler(3, 10, per_user_inflight=1, lane_limits={"book": 1})
+        sched.start()
+        gate = asyncio.Event()
+        books = [await sched.submit(user, gate.wait, lane="book") for user in (1, 2)]
+        short = await sched.submit(3, lambda: asyncio.sleep(0, "short"))
+        # Ikkinchi kitob kutadi, qisqa ish esa bo'sh worker'da darhol bajariladi
+        assert await asyncio.wait_for(short.future, 1) == "short"
+        assert sched.busy == 1 and sched.depth == 1
+        gate.set()
+        await asyncio.gather(*(job.future for job in books))
+        assert sched.snapshot()["completed"] == 3
+        await sched.stop()
+    asyncio.run(main())
@@ -0,0 +1,43 @@
+from config import VOICES
+from segmenter import detect_language, split_text_by_pattern, segment_text
+
+def _texts(segments):
+    return [seg['text'] for seg in segments]
+
+def test_detect_language():
+    assert detect_language("Hello world") == 'en'
+    assert detect_language("Привет, мир") == 'ru'
+    assert detect_language("Merhaba dünya") == 'tr'
+    assert detect_language("안녕하세요") == 'ko'
+    assert detect_language("مرحبا") == 'ar'
+    assert detect_language("123") == 'en'
+
+def test_sentences_split_on_terminator_and_whitespace():
+    assert _texts(split_text_by_pattern("Hello there. How are you? Fine!")) == [
+        "Hello there.", "How are you?", "Fine!"]
+
+def test_decimals_and_urls_are_not_split():
+    text = "Pi is 3.14 roughly. Visit example.com/a.b today."
+    assert _texts(split_text_by_pattern(text)) == ["Pi is 3.14 roughly.", "Visit example.com/a.b today."]
+
+def test_newline_ends_sentence():
+    assert _texts(split_text_by_pattern("First line\nSecond line")) == ["First line", "Second line"]
+
+def test_parentheses_are_uzbek():
+    segments = split_text_by_pattern("Hello! (Salom!) Привет.")
+    assert [(seg['text'], seg['lang']) for seg in segments] == [
+        ("Hello!", 'en'), ("Salom!", 'uz'), ("Привет.", 'ru')]
+
+def test_adjacent_same_voice_sentences_are_merged():
+    plan = segment_text("Hello there. How are you? (Salom!) Привет. Как дела?", "female_1")
+    assert _texts(plan) == ["Hello there. How are you?", "Salom!", "Привет. Как дела?"]
+    assert [seg['voice'] for seg in plan] == [
+        VOICES['en']['voices']['female_1']['id'],
+        VOICES['uz']['voices']['female_1']['id'],
+        VOICES['ru']['voices']['female_1']['id'],
+    ]
+
+def test_same_voice_across_parentheses_is_merged():
+    # Ketma-ket kelgan qavslar bitta o'zbekcha so'rovga birlashadi
+    plan = segment_text("(Salom!) (Qalaysiz?)", "male_1")
+    assert _texts(plan) == ["Salom! Qalaysiz?"]
@@ -0,0 +1,33 @@
+from utils import split_for_translation
+
+def _join(chunks):
+    return "".join(chunk + sep for chunk, sep in chunks)
+
+def test_short_text_is_one_chunk():
+    assert split_for_translation("Salom dunyo.", limit=100) == [("Salom dunyo.", "")]
+
+def test_chunks_respect_limit_and_round_trip():
+    text = "Birinchi gap. Ikkinchi gap! Uchinchi gap?\nYangi paragraf bu yerda. " * 20
+    text = text.strip()
+    chunks = split_for_translation(text, limit=60)
+    assert all(len(chunk) <= 60 for chunk, _ in chunks)
+    assert _join(chunks) == text
+
+def test_long_sentence_is_cut_at_space():
+    text = " ".join(["so'z"] * 50)
+    chunks = split_for_translation(text, limit=30)
+    assert all(len(chunk) <= 30 for chunk, _ in chunks)
+    assert all(not chunk.startswith(" ") and not chunk.endswith(" ") for chunk, _ in chunks)
+    assert _join(chunks) == text
+
+def test_hard_cut_does_not_insert_spaces():
+    word = "a" * 95
+    chunks = split_for_translation(word, limit=30)
+    assert [len(chunk) for chunk, _ in chunks] == [30, 30, 30, 5]
+    assert _join(chunks) == word
+
+def test_hard_cut_inside_sentence_keeps_surrounding_spaces():
+    text = "Boshi " + "x" * 70 + " oxiri."
+    chunks = split_for_translation(text, limit=30)
+    assert all(len(chunk) <= 30 for chunk, _ in chunks)
+    assert _join(chunks) == text
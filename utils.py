@@ -1,44 +1,227 @@
-import edge_tts
-import PyPDF2
-from docx import Document
-from deep_translator import GoogleTranslator
+import asyncio
+import hashlib
+import io
+import re
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 import os
+from aiogram.types import BufferedInputFile, FSInputFile
+from config import AUDIO_SPILL_BYTES, TTS_RATE, TRANSLATE_CHUNK_LIMIT, TRANSLATE_CONCURRENCY
+from database import get_cached_translation, save_cached_translation
+from metrics import metrics
+from resilience import tts_policy, translate_policy, tts_semaphore
 
-# --- Fayl o'qish ---
-def read_pdf(file_path):
-    text = ""
-    try:
-        reader = PyPDF2.PdfReader(file_path)
-        for page in reader.pages:
-            text += page.extract_text() + "\n"
-    except Exception as e:
-        return f"Error: {e}"
-    return text
-
-def read_docx(file_path):
-    text = ""
-    try:
-        doc = Document(file_path)
-        for para in doc.paragraphs:
-            text += para.text + "\n"
-    except Exception as e:
-        return f"Error: {e}"
-    return text
-
-def read_txt(file_path):
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return f.read()
-    except:
-        return ""
+# GoogleTranslator sinxron ishlaydi - event loop'ni bloklamasligi uchun alohida oqimlarda
+translate_pool = ThreadPoolExecutor(max_workers=TRANSLATE_CONCURRENCY, thread_name_prefix="translate")
+
+_SENTENCE_END = re.compile(r'(?<=[.!?。！？؟…])\s+')
 
 # --- Tarjima va TTS ---
+def _translation_pieces(text, limit):
+    """Matnni (bo'lak, keyingi ajratuvchi) juftliklariga bo'lish: avval paragraf, keyin gap bo'yicha."""
+    for para in text.split("\n"):
+        if len(para) <= limit:
+            yield para, "\n"
+            continue
+        sentences = _SENTENCE_END.split(para)
+        for j, sent in enumerate(sentences):
+            # Juda uzun gap (tinish belgisiz) - oxirgi bo'shliqdan kesiladi
+            while len(sent) > limit:
+                cut = sent.rfind(" ", 0, limit)
+                if cut <= 0:
+                    # Bo'shliq yo'q - so'z o'rtasidan kesiladi, qayta yig'ishda bo'shliq qo'shilmaydi
+                    yield sent[:limit], ""
+                    sent = sent[limit:]
+                    continue
+                yield sent[:cut], " "
+                sent = sent[cut:].lstrip()
+            yield sent, "\n" if j == len(sentences) - 1 else " "
+
+def split_for_translation(text, limit=TRANSLATE_CHUNK_LIMIT):
+    """Matnni provayder chegarasidan oshmaydigan bo'laklarga yig'ish. [(bo'lak, ajratuvchi), ...]"""
+    chunks = []
+    cur, cur_sep = "", ""
+    for piece, sep in _translation_pieces(text, limit):
+        if cur and len(cur) + len(cur_sep) + len(piece) > limit:
+            chunks.append((cur, cur_sep))
+            cur = piece
+        else:
+            cur = cur + cur_sep + piece if cur else piece
+        cur_sep = sep
+    if cur:
+        chunks.append((cur, ""))
+    return chunks
+
+def _translate_chunk(chunk, chunk_hash, target_lang):
+    """Provayderga bitta so'rov (oqimda ishlaydi), natija bazada keshlanadi."""
+    from deep_translator import GoogleTranslator  # og'ir modul - birinchi tarjimada yuklanadi
+    translated = GoogleTranslator(source='auto', target=target_lang).translate(chunk) or ""
+    save_cached_translation(chunk_hash, target_lang, translated)
+    return translated
+
 async def translate_text(text, target_lang):
-    if len(text) > 4500:
-        text = text[:4500] + "..."
-    translator = GoogleTranslator(source='auto', target=target_lang)
-    return translator.translate(text)
-
-async def generate_audio(text, voice, output_file):
-    communicate = edge_tts.Communicate(text, voice, rate="-10%")
-    await communicate.save(output_file)
+    with metrics.stage("translate"):
+        return await _translate_text(text, target_lang)
+
+async def _translate_text(text, target_lang):
+    chunks = split_for_translation(text)
+    loop = asyncio.get_running_loop()
+
+    async def run(chunk):
+        if not chunk.strip():
+            return chunk
+        chunk_hash = hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+        cached = await loop.run_in_executor(translate_pool, get_cached_translation, chunk_hash, target_lang)
+        if cached is not None:
+            return cached
+        # Muddat, qayta urinish va hedge faqat provayder so'roviga (kesh urinishlari p95 ni buzmasin)
+        return await translate_policy.call(
+            lambda: loop.run_in_executor(translate_pool, _translate_chunk, chunk, chunk_hash, target_lang),
+            size=len(chunk),
+        )
+
+    results = await asyncio.gather(*(run(chunk) for chunk, _ in chunks))
+    return "".join(res + sep for res, (_, sep) in zip(results, chunks))
+
+class AudioBuffer:
+    """
+    edge-tts oqimidan kelgan MP3 bo'laklari uchun yagona o'sib boruvchi bufer.
+    Hajm chegaradan oshsa, ma'lumot noyob vaqtinchalik faylga ko'chiriladi.
+    """
+
+    def __init__(self, spill_threshold=AUDIO_SPILL_BYTES):
+        self.spill_threshold = spill_threshold
+        self.path = None
+        self._mem = io.BytesIO()
+        self._file = None
+
+    @property
+    def spilled(self):
+        return self._file is not None
+
+    @property
+    def size(self):
+        # Fayl pozitsiyasi - concat_mp3 sendfile orqali write() ni chetlab yozgan baytlar ham hisoblanadi
+        return (self._file or self._mem).tell()
+
+    def _spill(self):
+        fd, self.path = tempfile.mkstemp(prefix="audio_", suffix=".mp3")
+        self._file = os.fdopen(fd, "wb")
+        self._file.write(self._mem.getbuffer())
+        self._mem = None
+
+    def write(self, data):
+        if self._file is None and self._mem.tell() + len(data) > self.spill_threshold:
+            self._spill()
+        (self._file or self._mem).write(data)
+
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+
+    def fileno(self):
+        """Fayl deskriptori (concat_mp3 sendfile uchun); xotiradagi ma'lumot avval faylga ko'chiriladi."""
+        if self._file is None:
+            self._spill()
+        return self._file.fileno()
+
+    def source(self):
+        """concat_mp3 uchun manba: faylda bo'lsa - yo'li (mmap/sendfile), aks holda xotiradagi baytlar."""
+        if self._file is not None:
+            self._file.flush()
+            return self.path
+        return self._mem.getbuffer()
+
+    def save(self, path):
+        """Buferni faylga nusxalash (masalan, disk keshi uchun)."""
+        if self._file is not None:
+            self._file.flush()
+            shutil.copyfile(self.path, path)
+        else:
+            with open(path, "wb") as f:
+                f.write(self._mem.getbuffer())
+
+    def as_input_file(self, filename):
+        """Telegram'ga yuklash uchun: kichik audio xotiradan, kattasi fayldan."""
+        if self._file is not None:
+            self._file.flush()
+            return FSInputFile(self.path, filename=filename)
+        return BufferedInputFile(self._mem.getvalue(), filename=filename)
+
+    def copy_to(self, sink):
+        """Butun buferni sink.write() ga ko'chirish (fayldagi bo'lsa - bo'lak-bo'lak)."""
+        if self._file is None:
+            with self._mem.getbuffer() as view:
+                sink.write(view)
+            return
+        self._file.flush()
+        with open(self.path, "rb") as f:
+            while chunk := f.read(1024 * 1024):
+                sink.write(chunk)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+async def _stream_audio(text, voice, sink, rate):
+    """Bitta edge-tts urinishi: audio bo'laklari to'g'ridan-to'g'ri sink.write() ga."""
+    import edge_tts  # og'ir modul - birinchi sintezda yuklanadi
+    communicate = edge_tts.Communicate(text, voice, rate=rate)
+    async for chunk in communicate.stream():
+        if chunk["type"] == "audio":
+            sink.write(chunk["data"])
+
+async def generate_audio(text, voice, sink, rate=TTS_RATE):
+    """
+    Matnni audioga aylantirib sink.write() ga yozish. Har bir urinish (qayta urinish yoki hedge)
+    o'z buferiga yozadi - yarim yozilgan audio aralashmaydi; g'olib natija sink'ga ko'chiriladi.
+    """
+    buffers = []
+
+    async def attempt():
+        buf = AudioBuffer()
+        buffers.append(buf)
+        await _stream_audio(text, voice, buf, rate)
+        return buf
+
+    with metrics.stage("tts"):
+        try:
+            winner = await tts_policy.call(attempt, size=len(text))
+            winner.copy_to(sink)
+        finally:
+            for buf in buffers:
+                buf.close()
+
+async def synthesize_segments(jobs, on_progress=None):
+    """
+    Segmentlarni parallel sintez qilish.
+    jobs: [(matn, ovoz), ...] - AudioBuffer'lar shu tartibda qaytadi, ularni chaqiruvchi yopadi.
+    Xotirada jami AUDIO_SPILL_BYTES gacha turadi: o'z ulushidan oshgan segment faylga o'tadi.
+    Qayta urinishlar generate_audio ichida; segment baribir xato bersa, qolganlari bekor qilinadi.
+    """
+    done = 0
+    buffers = [AudioBuffer(AUDIO_SPILL_BYTES // max(1, len(jobs))) for _ in jobs]
+
+    async def run(text, voice, buf):
+        nonlocal done
+        async with tts_semaphore:
+            await generate_audio(text, voice, buf)
+        done += 1
+        if on_progress:
+            await on_progress(done, len(jobs))
+
+    tasks = [asyncio.create_task(run(*job, buf)) for job, buf in zip(jobs, buffers)]
+    try:
+        await asyncio.gather(*tasks)
+        return buffers
+    except BaseException:
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for buf in buffers:
+            buf.close()
+        raise